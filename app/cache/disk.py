@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app import config
+from app.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger("furijapan")
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def make_key(*parts) -> str:
+    """Parçalardan kararlı bir SHA-256 önbellek anahtarı üret."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        elif isinstance(part, float):
+            h.update(f"{part:.4f}".encode("utf-8"))
+        else:
+            h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Worker'lar arasında paylaşılan disk önbelleği.
+
+    Her kayıt ayrı bir dosyada durur; SQLite dizini erişim zamanı, boyut ve
+    isabet/ıska sayaçlarını tutar. Toplam boyut ``max_bytes`` aşılınca en
+    uzun süredir kullanılmayan kayıtlar silinir, ``ttl`` dolan kayıtlar
+    ıska sayılır.
+    """
+
+    def __init__(self, root, max_bytes: int, ttl: Optional[float] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = self.root / "index.sqlite3"
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            " name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Bağlantı thread ve süreç başına açılır (gunicorn fork sonrası yeniden)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _file_path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _count(self, name: str):
+        self._conn().execute(
+            "INSERT INTO counters(name, value) VALUES(?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Kayıt varsa dosya yolunu döndür (isabet/ıska sayılır)."""
+        if not _KEY_RE.match(key):
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            path = self._file_path(key)
+            now = time.time()
+            if row is not None and self.ttl is not None and now - row[0] > self.ttl:
+                self.delete(key)
+                row = None
+            if row is None or not path.exists():
+                self._count("misses")
+                CACHE_REQUESTS.labels(self.root.name, "disk", "miss").inc()
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            CACHE_REQUESTS.labels(self.root.name, "disk", "hit").inc()
+            return path
+        except sqlite3.Error as e:
+            logger.error(f"Önbellek okuma hatası ({self.root.name}): {e}")
+            return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except OSError:
+            # Başka bir worker tam o anda silmiş olabilir
+            return None
+
+    def set(self, key: str, data: bytes) -> Optional[Path]:
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Geçersiz önbellek anahtarı: {key}")
+        path = self._file_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            now = time.time()
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries(key, size, created, accessed) VALUES(?, ?, ?, ?)",
+                (key, len(data), now, now)
+            )
+            self._evict()
+            return path
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Önbellek yazma hatası ({self.root.name}): {e}")
+            return None
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.unlink(self._file_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        conn = self._conn()
+        if self.ttl is not None:
+            expired = conn.execute(
+                "SELECT key FROM entries WHERE created < ?", (time.time() - self.ttl,)
+            ).fetchall()
+            for (key,) in expired:
+                self.delete(key)
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.delete(key)
+            total -= size
+
+    def stats(self) -> dict:
+        try:
+            conn = self._conn()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        except sqlite3.Error as e:
+            logger.error(f"Önbellek istatistik hatası ({self.root.name}): {e}")
+            return {}
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        total = hits + misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def named_cache(name: str, max_bytes: int, ttl: Optional[float] = None) -> DiskCache:
+    """Ada göre süreç genelinde tek DiskCache örneği döndür."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = DiskCache(config.CACHE_DIR / name, max_bytes=max_bytes, ttl=ttl)
+            _caches[name] = cache
+        return cache
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.cache.disk import DiskCache
+from app.metrics import CACHE_REQUESTS
+
+
+class MemoryCache:
+    """Süreç içi, bayt bütçeli LRU önbellek (bytes değerler için)."""
+
+    def __init__(self, max_bytes: int, name: str = "memory"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                CACHE_REQUESTS.labels(self.name, "memory", "miss").inc()
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.labels(self.name, "memory", "hit").inc()
+            return data
+
+    def set(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class TieredCache:
+    """Önce bellek, sonra (varsa) disk katmanına bakan önbellek."""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.memory.get(key)
+        if data is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.set(key, data)
+        return data
+
+    def set(self, key: str, data: bytes):
+        self.memory.set(key, data)
+        if self.disk is not None:
+            self.disk.set(key, data)
+
+    def stats(self) -> dict:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
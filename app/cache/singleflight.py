@@ -0,0 +1,174 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+# ``do_async`` liderinin başlattığı iş bu bağlamı taşır (run_ai bağlamı
+# thread'e kopyalar); iş aynı anahtarla ``do`` çağırırsa beklemeden çalışır.
+_leading: ContextVar[Optional[tuple]] = ContextVar("singleflight_leading", default=None)
+
+
+class SingleFlight:
+    """Aynı anahtarla eşzamanlı gelen çağrıları tek çağrıda birleştirir.
+
+    İlk gelen (lider) işi yapar; o bitene kadar aynı anahtarla gelenler
+    liderin sonucunu (veya hatasını) bekler. Sonuç saklanmaz, kalıcılık
+    önbelleklerin işidir. Birleştirme bu süreç içindedir; diğer worker'lar
+    sonucu ortak disk önbelleğinden görür.
+
+    Senkron çağıranlar (GUI, thread havuzu) ``do``, event loop ``do_async``
+    kullanır; ikisi aynı kayıt üzerinde birbirinin liderini bekler.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.shared = 0  # Lider beklenerek karşılanan çağrı sayısı
+
+    def do(self, key: str, func: Callable, *args, **kwargs):
+        if _leading.get() == (id(self), key):
+            # do_async liderinin işi içindeyiz; sonucu o paylaştırır
+            return func(*args, **kwargs)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key: str, start: Callable[[], Awaitable]):
+        """``do``'nun event loop sürümü: ``start()`` ile başlatılan işi paylaştır.
+
+        Takipçiler liderin sonucunu ``asyncio.wrap_future`` ile bekler; böylece
+        beklerken thread havuzunda yer tutmazlar. Liderin isteği iptal edilse
+        de iş sürer, takipçiler sonucu alır.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        token = _leading.set((id(self), key))
+        try:
+            task = asyncio.ensure_future(start())  # Görev bağlamı şimdi kopyalanır
+        finally:
+            _leading.reset(token)
+
+        def settle(done: asyncio.Task):
+            with self._lock:
+                self._calls.pop(key, None)
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+
+        task.add_done_callback(settle)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "shared": self.shared}
+
+
+class _Broadcast:
+    """Tek üreticinin parçalarını birden çok okuyucuya baştan itibaren dağıtır."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: bytes):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def close(self, error: Optional[BaseException] = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def read(self) -> AsyncIterator[bytes]:
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.chunks) or self.done)
+                new = self.chunks[index:]
+                done, error = self.done, self.error
+            for chunk in new:
+                yield chunk
+            index += len(new)
+            if done and index >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class StreamFlight:
+    """Aynı anahtarla eşzamanlı açılan akışları tek üreticide birleştirir.
+
+    İlk okuyucu üreticiyi başlatır; sonradan gelenler o ana kadarki
+    parçaları baştan alıp kalanları üretildikçe alır. Üretici okuyucular
+    ayrılsa da tamamlanır (sonuç önbelleğe yazılsın diye). Yalnızca event
+    loop'tan kullanılır.
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, _Broadcast] = {}
+        self.shared = 0
+
+    async def subscribe(self, key: str, start: Callable[[], AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _Broadcast()
+            self._streams[key] = stream
+            asyncio.ensure_future(self._produce(key, stream, start()))
+        else:
+            self.shared += 1
+        async for chunk in stream.read():
+            yield chunk
+
+    async def _produce(self, key: str, stream: _Broadcast, source: AsyncIterator[bytes]):
+        error = None
+        try:
+            async for chunk in source:
+                await stream.publish(chunk)
+        except Exception as e:
+            error = e
+        finally:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+            await stream.close(error)
+
+    def stats(self) -> dict:
+        return {"streams": len(self._streams), "shared": self.shared}
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Sunucu ayarları ortam değişkenlerinden okunur (Render Dashboard / .env)
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# --------- BELGE KAYDI ---------
+# Aynı anda açık tutulacak en fazla belge sayısı (açık dosya bütçesi)
+DOC_REGISTRY_MAX_DOCS = _env_int("FURIJAPAN_MAX_OPEN_DOCS", 16)
+# Açık belgelerin toplam boyut bütçesi (MB)
+DOC_REGISTRY_MAX_BYTES = _env_int("FURIJAPAN_DOC_MEMORY_MB", 512) * 1024 * 1024
+
+# --------- ORTAK DİSK DEPOSU ---------
+# Tüm worker'ların paylaştığı yerel klasör (belgeler, önbellekler)
+DATA_DIR = Path(os.getenv("FURIJAPAN_DATA_DIR", Path(tempfile.gettempdir()) / "furijapan"))
+DOCUMENT_STORE_DIR = DATA_DIR / "documents"
+
+# --------- YÜKLEMELER ---------
+# Bu boyutu aşan yüklemeler 413 ile reddedilir (MB)
+UPLOAD_MAX_BYTES = _env_int("FURIJAPAN_UPLOAD_MAX_MB", 200) * 1024 * 1024
+# Yükleme diske bu büyüklükte parçalarla yazılır; bellekte tek parça tutulur
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# --------- AI ÇAĞRILARI ---------
+# Worker başına aynı anda yürütülebilecek en fazla OpenAI isteği
+AI_MAX_CONCURRENCY = _env_int("FURIJAPAN_AI_MAX_CONCURRENCY", 32)
+# Model başına hız sınırları (hesap geneli; kovalar tüm worker'larda ortaktır)
+AI_RPM = _env_int("FURIJAPAN_AI_RPM", 480)
+AI_TPM = _env_int("FURIJAPAN_AI_TPM", 30000)
+TTS_RPM = _env_int("FURIJAPAN_TTS_RPM", 480)
+RATE_LIMIT_DB_PATH = DATA_DIR / "ratelimit.sqlite3"
+# Model başına aynı anda yukarıda bekleyen en fazla istek (açık akışlar dahil)
+AI_MAX_IN_FLIGHT = _env_int("FURIJAPAN_AI_MAX_IN_FLIGHT", 16)
+# 429/5xx/bağlantı hatalarında tekrar deneme
+AI_MAX_RETRIES = _env_int("FURIJAPAN_AI_MAX_RETRIES", 5)
+AI_RETRY_MAX_DELAY = _env_int("FURIJAPAN_AI_RETRY_MAX_DELAY", 30)
+
+# --------- SONUÇ ÖNBELLEKLERİ ---------
+CACHE_DIR = DATA_DIR / "cache"
+DAY = 24 * 60 * 60
+# OCR sonuçları (sayfa görüntüsü özeti + model + sıcaklık + prompt sürümü)
+OCR_CACHE_MAX_BYTES = _env_int("FURIJAPAN_OCR_CACHE_MB", 64) * 1024 * 1024
+OCR_CACHE_TTL = _env_int("FURIJAPAN_OCR_CACHE_TTL_DAYS", 30) * DAY
+# Furigana HTML (normalleştirilmiş metin özeti + mod)
+FURIGANA_CACHE_MAX_BYTES = _env_int("FURIJAPAN_FURIGANA_CACHE_MB", 64) * 1024 * 1024
+FURIGANA_CACHE_TTL = _env_int("FURIJAPAN_FURIGANA_CACHE_TTL_DAYS", 30) * DAY
+# TTS sesleri (metin özeti + ses + model)
+SPEECH_CACHE_MAX_BYTES = _env_int("FURIJAPAN_SPEECH_CACHE_MB", 256) * 1024 * 1024
+SPEECH_CACHE_TTL = _env_int("FURIJAPAN_SPEECH_CACHE_TTL_DAYS", 30) * DAY
+
+# --------- SAYFA GÖRÜNTÜ ÖNBELLEĞİ ---------
+# Worker başına bellek bütçesi
+PAGE_CACHE_MEMORY_BYTES = _env_int("FURIJAPAN_PAGE_CACHE_MB", 128) * 1024 * 1024
+# İsteğe bağlı ortak disk katmanı (0 = kapalı)
+PAGE_CACHE_DISK_BYTES = _env_int("FURIJAPAN_PAGE_DISK_CACHE_MB", 0) * 1024 * 1024
+PAGE_CACHE_DISK_TTL = _env_int("FURIJAPAN_PAGE_DISK_CACHE_TTL_DAYS", 7) * DAY
+
+# --------- KOMŞU SAYFA ÖN YÜKLEME ---------
+# Görüntülenen sayfanın kaç komşusu (N±1..N±k) arka planda hazırlanır
+PREFETCH_DEPTH = _env_int("FURIJAPAN_PREFETCH_DEPTH", 2)
+PREFETCH_WORKERS = _env_int("FURIJAPAN_PREFETCH_WORKERS", 2)
+# Komşu sayfaların OCR'ı da önceden yapılsın mı (API maliyeti vardır)
+PREFETCH_OCR = os.getenv("FURIJAPAN_PREFETCH_OCR", "0").lower() in ("1", "true", "yes")
+
+# --------- TOPLU OCR ---------
+# Tek bir toplu OCR isteğinde aynı anda işlenebilecek en fazla sayfa
+BATCH_OCR_MAX_CONCURRENCY = _env_int("FURIJAPAN_BATCH_OCR_MAX_CONCURRENCY", 8)
+
+# --------- SESLENDİRME ---------
+# Uzun metinler bu uzunlukta parçalara bölünür (tts-1 sınırı 4096 karakter)
+TTS_CHUNK_CHARS = min(_env_int("FURIJAPAN_TTS_CHUNK_CHARS", 800), 4000)
+# Bir metnin aynı anda üretilebilecek en fazla parça sayısı
+TTS_CHUNK_CONCURRENCY = _env_int("FURIJAPAN_TTS_CHUNK_CONCURRENCY", 4)
+
+# --------- FURIGANA ---------
+# Okunuşlar önce yerel sözlükten çıkarılır; sadece belirsiz kelimeler LLM'e sorulur
+LOCAL_FURIGANA = os.getenv("FURIJAPAN_LOCAL_FURIGANA", "1").lower() in ("1", "true", "yes")
+# Paketteki çekirdek sözlüğe eklenecek (aynı formatta) daha büyük sözlük dosyası
+FURIGANA_DICT = os.getenv("FURIJAPAN_FURIGANA_DICT")
+# Kanjilerin bu yüzdesinden fazlası belirsizse tüm metin doğrudan LLM'e gönderilir
+FURIGANA_MAX_UNKNOWN_PERCENT = _env_int("FURIJAPAN_FURIGANA_MAX_UNKNOWN_PERCENT", 50)
+
+# --------- METİN KATMANI ---------
+# Dijital PDF'lerde gömülü metin yeterince iyiyse görsel OCR'a gidilmez
+TEXT_LAYER_OCR = os.getenv("FURIJAPAN_TEXT_LAYER_OCR", "1").lower() in ("1", "true", "yes")
+# Metin katmanının kabul edilmesi için gereken en az (boşluksuz) karakter
+TEXT_LAYER_MIN_CHARS = _env_int("FURIJAPAN_TEXT_LAYER_MIN_CHARS", 20)
+
+# --------- OCR ÖN İŞLEME ---------
+# Görüntüler OCR'a gönderilmeden önce küçültülür (model zaten ~2048 piksele indirir)
+OCR_MAX_EDGE = _env_int("FURIJAPAN_OCR_MAX_EDGE", 2048)
+OCR_IMAGE_FORMAT = os.getenv("FURIJAPAN_OCR_IMAGE_FORMAT", "webp").lower()
+OCR_IMAGE_QUALITY = _env_int("FURIJAPAN_OCR_IMAGE_QUALITY", 85)
+OCR_GRAYSCALE = os.getenv("FURIJAPAN_OCR_GRAYSCALE", "1").lower() in ("1", "true", "yes")
+# Siyah-beyaz (Otsu eşiği); düşük kontrastlı taramalarda işe yarar
+OCR_BINARIZE = os.getenv("FURIJAPAN_OCR_BINARIZE", "0").lower() in ("1", "true", "yes")
+
+# --------- BÖLGE OCR ---------
+# Taranmış sayfada yalnızca metin bölgeleri kesilip (paralel) OCR'a gönderilir
+REGION_OCR = os.getenv("FURIJAPAN_REGION_OCR", "1").lower() in ("1", "true", "yes")
+# Bölgeler sayfanın bu yüzdesinden fazlasını kaplıyorsa tüm sayfa gönderilir
+REGION_OCR_MAX_AREA_PERCENT = _env_int("FURIJAPAN_REGION_OCR_MAX_AREA_PERCENT", 70)
+# Bir sayfa için en fazla bölge (fazlası tek içerik kutusuna indirilir)
+REGION_OCR_MAX_REGIONS = _env_int("FURIJAPAN_REGION_OCR_MAX_REGIONS", 4)
+# Bölgeleri ayıran boşluğun sayfa boyutuna oranı (yüzde)
+REGION_OCR_MIN_GAP_PERCENT = _env_int("FURIJAPAN_REGION_OCR_MIN_GAP_PERCENT", 3)
+
+# --------- ARKA PLAN İŞLERİ ---------
+# Uzun OCR/furigana/seslendirme işleri bu SQLite dosyasında tutulur
+JOBS_DB_PATH = DATA_DIR / "jobs.sqlite3"
+# Bir işin aynı anda işlenen en fazla sayfası (worker başına)
+JOB_CONCURRENCY = _env_int("FURIJAPAN_JOB_CONCURRENCY", 8)
+# Bu kadar saniye sinyal vermeyen worker'ın işi başkasına geçer
+JOB_STALE_SECONDS = _env_int("FURIJAPAN_JOB_STALE_SECONDS", 60)
+
+# --------- İSTEK SÜRELERİ ---------
+# Yanıtlara aşama sürelerini içeren Server-Timing başlığı eklenir
+SERVER_TIMING = os.getenv("FURIJAPAN_SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+# Bu kadar milisaniyeden uzun süren istekler JSON satırı olarak loglanır (0: kapalı)
+SLOW_REQUEST_MS = _env_int("FURIJAPAN_SLOW_REQUEST_MS", 5000)
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from app.docs.registry import OpenDocument
+
+logger = logging.getLogger("furijapan")
+
+
+async def ocr_pages(
+    doc: OpenDocument,
+    pages: Iterable[int],
+    ocr_page: Callable[[OpenDocument, int], Awaitable[str]],
+    concurrency: int
+) -> AsyncIterator[dict]:
+    """Sayfaları en fazla ``concurrency`` paralel işle OCR'la, bitenleri sırayla değil geldikçe ver."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(page_num: int) -> dict:
+        async with semaphore:
+            try:
+                text = await ocr_page(doc, page_num)
+                return {"page": page_num, "text": text}
+            except Exception as e:
+                logger.error(f"Toplu OCR hatası (sayfa {page_num}): {e}")
+                return {"page": page_num, "error": str(e)}
+
+    tasks = [asyncio.ensure_future(run(p)) for p in pages]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # İstemci bağlantıyı kestiyse kalan işleri bırak
+        for task in tasks:
+            task.cancel()
+
+
+def encode_event(event: dict, stream_format: str) -> str:
+    """Olayı NDJSON satırı veya Server-Sent Events mesajı olarak kodla."""
+    payload = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"data: {payload}\n\n"
+    return payload + "\n"
@@ -0,0 +1,88 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+from app.docs.registry import OpenDocument
+
+logger = logging.getLogger("furijapan")
+
+
+def neighbour_pages(page_num: int, depth: int, total_pages: int) -> list:
+    """N+1, N-1, N+2, N-2 ... sırasıyla komşu sayfalar (ileri yön önce)."""
+    pages = []
+    for step in range(1, depth + 1):
+        for candidate in (page_num + step, page_num - step):
+            if 0 <= candidate < total_pages:
+                pages.append(candidate)
+    return pages
+
+
+class Prefetcher:
+    """Görüntülenen sayfanın komşularını arka planda hazırlar.
+
+    İşler sınırlı bir thread havuzunda çalışır. Kullanıcı başka sayfaya
+    geçince henüz başlamamış eski işler iptal edilir; belge kayıttan
+    çıkarılınca ``cancel`` ile o belgenin tüm işleri bırakılır.
+    """
+
+    def __init__(self, max_workers: int = 2, depth: int = 2):
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="prefetch"
+        )
+        self._pending: Dict[str, Dict[tuple, Future]] = {}
+        # Biten işin geri çağrısı submit anında aynı thread'de çalışabilir
+        self._lock = threading.RLock()
+
+    def schedule(self, doc: OpenDocument, page_num: int,
+                 task: Callable[[OpenDocument, int], object], kind: str = "render"):
+        """``task(doc, sayfa)`` çağrısını N±1..N±depth sayfaları için kuyruğa al."""
+        if self.depth <= 0 or doc.total_pages <= 1:
+            return
+        ordered = [(kind, p) for p in neighbour_pages(page_num, self.depth, doc.total_pages)]
+        wanted = set(ordered)
+        with self._lock:
+            pending = self._pending.setdefault(doc.doc_id, {})
+            # Artık pencere dışında kalan ve başlamamış işleri bırak
+            for key, future in list(pending.items()):
+                if key[0] == kind and key not in wanted and future.cancel():
+                    pending.pop(key, None)
+            for key in ordered:
+                if key in pending:
+                    continue
+                # İş bitene (veya iptal edilene) kadar belge kapanmasın
+                doc.retain()
+                future = self._executor.submit(self._run, doc, key[1], task)
+                pending[key] = future
+                future.add_done_callback(
+                    lambda f, doc=doc, key=key: self._forget(doc, key, f)
+                )
+
+    def cancel(self, doc_id: str):
+        with self._lock:
+            pending = self._pending.pop(doc_id, {})
+        for future in pending.values():
+            future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _forget(self, doc: OpenDocument, key: tuple, future: Future):
+        with self._lock:
+            pending = self._pending.get(doc.doc_id)
+            # Belge düzeyindeki sözlük belge kayıttan çıkınca (cancel) silinir
+            if pending is not None and pending.get(key) is future:
+                del pending[key]
+        doc.release()
+
+    @staticmethod
+    def _run(doc: OpenDocument, page_num: int, task: Callable):
+        if doc.is_pdf and doc.pdf is None:
+            return None  # Belge bu arada kapatıldı
+        try:
+            return task(doc, page_num)
+        except Exception as e:
+            logger.debug(f"Ön yükleme hatası ({doc.doc_id}, sayfa {page_num}): {e}")
+            return None
@@ -0,0 +1,137 @@
+import io
+import logging
+import threading
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+from app import config
+
+logger = logging.getLogger("furijapan")
+
+_MIME = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+_stats = {"images": 0, "bytes_in": 0, "bytes_out": 0}
+_stats_lock = threading.Lock()
+
+
+def sniff_mime(data: bytes) -> str:
+    """Başlık baytlarından görüntü MIME tipini bul."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def settings_key() -> tuple:
+    """Ön işleme ayarları; değişirse OCR önbellek anahtarı da değişir."""
+    return (
+        config.OCR_IMAGE_FORMAT, config.OCR_IMAGE_QUALITY, config.OCR_MAX_EDGE,
+        config.OCR_GRAYSCALE, config.OCR_BINARIZE,
+    )
+
+
+def otsu_threshold(img: Image.Image) -> int:
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, threshold = -1.0, 127
+    for i, h in enumerate(hist):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def prepare_ocr_image(data: bytes) -> Tuple[bytes, str]:
+    """Görüntüyü OCR'a göndermeden önce küçült: (bayt, MIME).
+
+    Gri tonlamaya çevirir, uzun kenarı OCR_MAX_EDGE ile sınırlar, istenirse
+    Otsu eşiğiyle siyah-beyaz yapar ve WebP/JPEG olarak kodlar. Sonuç
+    orijinalden büyükse orijinal gönderilir.
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        if config.OCR_MAX_EDGE and max(img.size) > config.OCR_MAX_EDGE:
+            # JPEG'i çözerken doğrudan küçült (ve griye çevir); diğerlerinde etkisiz
+            scale = config.OCR_MAX_EDGE / max(img.size)
+            mode = "L" if config.OCR_GRAYSCALE else img.mode
+            img.draft(mode, (round(img.width * scale), round(img.height * scale)))
+        img = ImageOps.exif_transpose(img)
+    except Exception as e:
+        logger.debug(f"OCR ön işleme atlandı: {e}")
+        return data, sniff_mime(data)
+
+    if img.mode in ("RGBA", "LA", "P"):
+        # Saydam alanlar siyah değil beyaz olsun
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+        img = background
+    img = img.convert("L") if config.OCR_GRAYSCALE else img.convert("RGB")
+
+    long_edge = max(img.size)
+    if config.OCR_MAX_EDGE and long_edge > config.OCR_MAX_EDGE:
+        scale = config.OCR_MAX_EDGE / long_edge
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS)
+
+    if config.OCR_BINARIZE:
+        gray = img if img.mode == "L" else img.convert("L")
+        threshold = otsu_threshold(gray)
+        img = gray.point(lambda p: 255 if p > threshold else 0)
+
+    fmt = config.OCR_IMAGE_FORMAT
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, "WEBP", quality=config.OCR_IMAGE_QUALITY, method=4)
+    elif fmt == "jpeg":
+        img.save(buf, "JPEG", quality=config.OCR_IMAGE_QUALITY, optimize=True)
+    else:
+        fmt = "png"
+        img.save(buf, "PNG", optimize=True)
+    out = buf.getvalue()
+
+    if len(out) >= len(data):
+        out, mime = data, sniff_mime(data)
+    else:
+        mime = _MIME[fmt]
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["bytes_in"] += len(data)
+        _stats["bytes_out"] += len(out)
+    logger.info(
+        f"OCR görüntüsü: {len(data) // 1024} KB -> {len(out) // 1024} KB "
+        f"({(len(data) - len(out)) // 1024} KB kazanç)"
+    )
+    return out, mime
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """Görüntünün (genişlik, yükseklik) değeri; yalnızca başlık okunur."""
+    try:
+        return Image.open(io.BytesIO(data)).size
+    except Exception:
+        return 0, 0
+
+
+def preprocess_stats() -> dict:
+    """Bu süreçte ön işlenen görüntü sayısı ve kazanılan bayt."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    return stats
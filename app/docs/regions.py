@@ -0,0 +1,134 @@
+import io
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app import config
+from app.docs.preprocess import otsu_threshold
+
+logger = logging.getLogger("furijapan")
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1 (piksel)
+
+
+def _runs(profile: np.ndarray, min_gap: int) -> List[Tuple[int, int]]:
+    """Profilde mürekkep olan aralıklar; ``min_gap``'ten kısa boşluklar birleşir."""
+    ink = np.flatnonzero(profile)
+    if ink.size == 0:
+        return []
+    # Ardışık mürekkep indeksleri arasındaki boşluk = fark - 1
+    splits = np.flatnonzero(np.diff(ink) - 1 > min_gap)
+    starts = np.concatenate(([ink[0]], ink[splits + 1]))
+    ends = np.concatenate((ink[splits], [ink[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _profile(mask: np.ndarray, axis: int) -> np.ndarray:
+    # Toz/leke gibi tek tük pikselleri mürekkep sayma
+    counts = mask.sum(axis=axis)
+    return counts > max(1, int(mask.shape[axis] * 0.002))
+
+
+def _median_gap(profile: np.ndarray) -> float:
+    runs = _runs(profile, 0)
+    gaps = [b[0] - a[1] for a, b in zip(runs, runs[1:])]
+    return float(np.median(gaps)) if gaps else 0.0
+
+
+def is_vertical(mask: np.ndarray) -> bool:
+    """Dikey yazı (tategaki) mı? Satır arası boşluk harf arasından geniştir."""
+    return _median_gap(_profile(mask, 0)) > _median_gap(_profile(mask, 1))
+
+
+def find_text_regions(mask: np.ndarray) -> List[Box]:
+    """Mürekkep maskesinde metin bölgelerini okuma sırasıyla bul.
+
+    Önce yatay boşluklarla bantlara, sonra her bant dikey boşluklarla
+    bloklara ayrılır (iki seviyeli XY kesimi). Dikey yazıda bloklar sağdan
+    sola, yatay yazıda soldan sağa sıralanır. Boşluk eşiği sayfa boyutunun
+    REGION_OCR_MIN_GAP_PERCENT'idir; böylece sıradan satır/sütun araları
+    bölünmez.
+    """
+    height, width = mask.shape
+    gap_y = max(1, height * config.REGION_OCR_MIN_GAP_PERCENT // 100)
+    gap_x = max(1, width * config.REGION_OCR_MIN_GAP_PERCENT // 100)
+    right_to_left = is_vertical(mask)
+
+    boxes = []
+    for y0, y1 in _runs(_profile(mask, 1), gap_y):
+        band = mask[y0:y1]
+        cols = _runs(_profile(band, 0), gap_x)
+        if right_to_left:
+            cols.reverse()
+        for x0, x1 in cols:
+            rows = _runs(_profile(band[:, x0:x1], 1), 0)
+            if rows:
+                boxes.append((x0, y0 + rows[0][0], x1, y0 + rows[-1][1]))
+    return boxes
+
+
+def _bounding(boxes: Sequence[Box]) -> Box:
+    return (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes),
+    )
+
+
+def crop_text_regions(image_bytes: bytes,
+                      hint_boxes: Optional[Sequence[Box]] = None) -> Optional[List[bytes]]:
+    """Sayfadan yalnızca metin bölgelerini kes (PNG, okuma sırasıyla).
+
+    ``hint_boxes`` (örn. PDF blok bilgisi) verilirse projeksiyon yerine o
+    kullanılır. Bölgeler sayfanın REGION_OCR_MAX_AREA_PERCENT'inden fazlasını
+    kaplıyorsa kırpmanın kazancı yoktur, None döner; çağıran tüm sayfayı
+    gönderir. Bölge sayısı REGION_OCR_MAX_REGIONS'ı aşarsa tek bir içerik
+    kutusuna (kenar boşlukları atılmış sayfa) indirilir.
+    """
+    if not config.REGION_OCR:
+        return None
+    img = Image.open(io.BytesIO(image_bytes))
+    full_width, full_height = img.size
+    if config.OCR_MAX_EDGE and max(img.size) > config.OCR_MAX_EDGE:
+        # Ön işleme zaten bu boyuta indirir; JPEG'i çözerken küçült ve griye çevir
+        scale = config.OCR_MAX_EDGE / max(img.size)
+        img.draft("L", (round(img.width * scale), round(img.height * scale)))
+    # Telefon fotoğrafları: EXIF yönü uygulanmazsa kırpıntılar yan gider
+    img = ImageOps.exif_transpose(img)
+    gray = img.convert("L")
+
+    if hint_boxes:
+        # İpucu kutuları tam boyutlu görüntünün koordinatlarındadır
+        sx, sy = img.width / full_width, img.height / full_height
+        boxes = [
+            (int(x0 * sx), int(y0 * sy), int(x1 * sx) + 1, int(y1 * sy) + 1)
+            for x0, y0, x1, y1 in hint_boxes
+        ]
+    else:
+        arr = np.asarray(gray)
+        mask = arr <= otsu_threshold(gray)
+        boxes = find_text_regions(mask)
+    if not boxes:
+        return None
+    if len(boxes) > config.REGION_OCR_MAX_REGIONS:
+        boxes = [_bounding(boxes)]
+
+    pad = max(4, min(img.size) // 100)
+    boxes = [
+        (max(0, x0 - pad), max(0, y0 - pad), min(img.width, x1 + pad), min(img.height, y1 + pad))
+        for x0, y0, x1, y1 in boxes
+    ]
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+    if area > img.width * img.height * config.REGION_OCR_MAX_AREA_PERCENT / 100:
+        return None
+
+    logger.debug(
+        f"Bölge OCR: {len(boxes)} bölge, sayfanın %{100 * area // (img.width * img.height)}'i"
+    )
+    crops = []
+    for box in boxes:
+        buf = io.BytesIO()
+        gray.crop(box).save(buf, "PNG")
+        crops.append(buf.getvalue())
+    return crops
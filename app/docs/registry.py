@@ -0,0 +1,199 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger("furijapan")
+
+
+class OpenDocument:
+    """Kayıtta tutulan tek bir belge (PDF veya resim)."""
+
+    def __init__(self, doc_id: str, filename: Optional[str], is_pdf: bool,
+                 pdf=None, image: Optional[bytes] = None,
+                 path: Optional[str] = None, size: int = 0,
+                 mime: Optional[str] = None):
+        self.doc_id = doc_id
+        self.filename = filename
+        self.is_pdf = is_pdf
+        self.pdf = pdf
+        # Resimler yüklendiği haliyle (yeniden kodlanmadan) tutulur
+        self.image = image
+        self.mime = mime
+        self.path = path
+        self.size = size
+        # fitz.Document thread-safe değil, sayfa işlemleri bu kilitle yapılır
+        self.lock = threading.Lock()
+        # Kullanımdaki belge kayıttan çıkarılsa da son kullanıcı bırakana kadar açık kalır
+        self._leases = 0
+        self._retired = False
+        self._lease_lock = threading.Lock()
+
+    @property
+    def total_pages(self) -> int:
+        if self.is_pdf and self.pdf is not None:
+            return self.pdf.page_count
+        return 1 if self.image else 0
+
+    def retain(self):
+        """Belgeyi kullanıma al; her ``retain`` için bir ``release`` çağrılmalı."""
+        with self._lease_lock:
+            self._leases += 1
+
+    def release(self):
+        with self._lease_lock:
+            self._leases -= 1
+            close = self._retired and self._leases <= 0
+        if close:
+            self.close()
+
+    def retire(self):
+        """Kayıttan çıkarıldı: kullanan yoksa hemen, varsa son ``release``'te kapanır."""
+        with self._lease_lock:
+            self._retired = True
+            close = self._leases <= 0
+        if close:
+            self.close()
+
+    def close(self):
+        """PDF'i kapat. Dosyanın kendisi ortak depoda kalır."""
+        with self.lock:
+            if self.pdf is not None:
+                try:
+                    self.pdf.close()
+                except Exception:
+                    pass
+                self.pdf = None
+            self.image = None
+
+
+class DocumentRegistry:
+    """Belge kimliğine göre açık belgeleri tutan LRU kayıt.
+
+    Açık belge sayısı ``max_docs``, toplam boyut ``max_bytes`` ile sınırlıdır;
+    sınır aşılınca en uzun süredir kullanılmayan belge kayıttan çıkarılır.
+    Kayıtta olmayan bir kimlik istenirse ``loader`` ile (örn. ortak depodan)
+    açılır.
+
+    ``acquire`` belgeyi kiralar; çağıran işi bitince ``doc.release()`` der.
+    Kirada olan belge kayıttan çıksa bile son kiracı bırakana kadar kapanmaz.
+    """
+
+    def __init__(self, max_docs: int = 16, max_bytes: int = 512 * 1024 * 1024,
+                 loader: Optional[Callable[[str], Optional[OpenDocument]]] = None):
+        self.max_docs = max(1, max_docs)
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._evict_listeners = []
+        self._docs: "OrderedDict[str, OpenDocument]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def add_evict_listener(self, listener: Callable[[str], None]):
+        """Belge kayıttan çıkınca ``listener(doc_id)`` çağrılır."""
+        self._evict_listeners.append(listener)
+
+    def _closed(self, doc: OpenDocument):
+        for listener in self._evict_listeners:
+            try:
+                listener(doc.doc_id)
+            except Exception as e:
+                logger.error(f"Belge çıkarma dinleyicisi hatası: {e}")
+        doc.retire()
+
+    def add(self, doc: OpenDocument) -> str:
+        evicted = []
+        with self._lock:
+            old = self._docs.pop(doc.doc_id, None)
+            if old is not None:
+                self._bytes -= old.size
+                evicted.append(old)
+            self._insert_locked(doc)
+            evicted.extend(self._evict_locked())
+        for old in evicted:
+            if old is not doc:
+                self._closed(old)
+        return doc.doc_id
+
+    def acquire(self, doc_id: Optional[str]) -> Optional[OpenDocument]:
+        """Belgeyi kirala (gerekirse depodan aç); işi bitince ``doc.release()``."""
+        if not doc_id:
+            return None
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is not None:
+                self._docs.move_to_end(doc_id)
+                doc.retain()
+                return doc
+        if self.loader is None:
+            return None
+
+        # Başka bir worker'ın yüklediği belge olabilir
+        loaded = self.loader(doc_id)
+        if loaded is None:
+            return None
+        evicted = []
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is None:
+                doc = loaded
+                self._insert_locked(doc)
+                evicted = self._evict_locked()
+            else:
+                self._docs.move_to_end(doc_id)
+            # Kira çıkarmadan önce alınır; yeni belge hemen kapanamaz
+            doc.retain()
+        if doc is not loaded:
+            # Aynı anda başka bir istek açmış; bizimkini kimse görmedi, kapat
+            loaded.close()
+        for old in evicted:
+            if old is not doc:
+                self._closed(old)
+        return doc
+
+    def contains(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._docs
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is not None:
+                self._bytes -= doc.size
+        if doc is None:
+            return False
+        self._closed(doc)
+        return True
+
+    def close_all(self):
+        with self._lock:
+            docs = list(self._docs.values())
+            self._docs.clear()
+            self._bytes = 0
+        for doc in docs:
+            self._closed(doc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_docs": len(self._docs),
+                "max_docs": self.max_docs,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _insert_locked(self, doc: OpenDocument):
+        self._docs[doc.doc_id] = doc
+        self._bytes += doc.size
+
+    def _evict_locked(self) -> list:
+        """Bütçe aşıldıysa en eski belgeleri çıkar (en yeni belge her zaman kalır)."""
+        evicted = []
+        while len(self._docs) > 1 and (
+            len(self._docs) > self.max_docs or self._bytes > self.max_bytes
+        ):
+            doc_id, doc = self._docs.popitem(last=False)
+            self._bytes -= doc.size
+            evicted.append(doc)
+            logger.info(f"Belge kayıttan çıkarıldı (LRU): {doc_id}")
+        return evicted
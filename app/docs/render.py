@@ -0,0 +1,131 @@
+import io
+from contextlib import contextmanager
+from typing import Optional
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageOps
+
+from app import config
+from app.cache.disk import make_key, named_cache
+from app.cache.memory import MemoryCache, TieredCache
+from app.metrics import RENDER_SECONDS
+from app.timing import phase
+from app.docs.registry import OpenDocument
+
+# Görüntüleme ve OCR için kullanılan yakınlaştırma oranları
+VIEW_ZOOM = 2.0
+OCR_ZOOM = 3.0
+
+# Desteklenen çıktı formatları ve MIME tipleri
+IMAGE_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+# Tarayıcıların doğrudan gösterebildiği yüklenmiş resim türleri
+WEB_IMAGE_TYPES = {"image/png", "image/jpeg", "image/webp", "image/gif"}
+
+
+@contextmanager
+def _stage(name: str):
+    """Render aşamasını hem Prometheus'a hem isteğin Server-Timing'ine yaz."""
+    with RENDER_SECONDS.labels(name).time(), phase(name):
+        yield
+
+
+def render_page_png(doc: OpenDocument, page_num: int, zoom: float) -> bytes:
+    """PDF sayfasını PNG olarak rasterize et (bloklayan çağrı, thread'de çalıştır)."""
+    with doc.lock:
+        page = doc.pdf.load_page(page_num)
+        with _stage("rasterize"):
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    with _stage("encode"):
+        return pix.tobytes("png")
+
+
+def _build_page_cache() -> TieredCache:
+    disk = None
+    if config.PAGE_CACHE_DISK_BYTES > 0:
+        disk = named_cache("pages", config.PAGE_CACHE_DISK_BYTES, config.PAGE_CACHE_DISK_TTL)
+    return TieredCache(MemoryCache(config.PAGE_CACHE_MEMORY_BYTES, name="pages"), disk)
+
+
+# Kodlanmış sayfa görüntüleri: (belge özeti, sayfa, zoom, format)
+page_cache = _build_page_cache()
+
+
+def page_cache_key(doc_id: str, page_num: int, zoom: float, fmt: str,
+                   quality: Optional[int] = None, max_width: Optional[int] = None) -> str:
+    return make_key("page", doc_id, page_num, float(zoom), fmt, quality, max_width)
+
+
+def encode_image(img: Image.Image, fmt: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        img.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True)
+    elif fmt == "webp":
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def render_page_image(doc: OpenDocument, page_num: int, fmt: str, quality: int,
+                      max_width: Optional[int] = None, zoom: float = VIEW_ZOOM) -> bytes:
+    """Sayfayı istenen formatta, en fazla ``max_width`` piksel genişlikte kodla."""
+    if doc.is_pdf:
+        with doc.lock:
+            page = doc.pdf.load_page(page_num)
+            if max_width:
+                # Büyük render alıp küçültmek yerine doğrudan hedef genişlikte rasterize et
+                zoom = min(zoom, max_width / page.rect.width)
+            with _stage("rasterize"):
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        if fmt == "png":
+            with _stage("encode"):
+                return pix.tobytes("png")
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    else:
+        img = Image.open(io.BytesIO(doc.image))  # Sadece başlık okunur
+        needs_resize = bool(max_width) and img.width > max_width
+        if not needs_resize and IMAGE_FORMATS[fmt] == doc.mime:
+            # İstenen biçim zaten yüklenen biçim: yeniden kodlamadan ver
+            return doc.image
+        if needs_resize:
+            height = max(1, round(img.height * max_width / img.width))
+            # JPEG'i çözerken doğrudan küçült (DCT ölçekleme); diğerlerinde etkisiz
+            img.draft(img.mode, (max_width, height))
+        img = ImageOps.exif_transpose(img)
+        if max_width and img.width > max_width:
+            height = max(1, round(img.height * max_width / img.width))
+            img = img.resize((max_width, height), Image.LANCZOS)
+    with _stage("encode"):
+        return encode_image(img, fmt, quality)
+
+
+def get_page_image(doc: OpenDocument, page_num: int, fmt: str, quality: int,
+                   max_width: Optional[int] = None,
+                   cache: Optional[TieredCache] = page_cache) -> bytes:
+    """Kodlanmış sayfa görüntüsünü önbellekten döndür, yoksa üretip önbelleğe koy."""
+    key = page_cache_key(doc.doc_id, page_num, VIEW_ZOOM, fmt, quality, max_width)
+    data = cache.get(key) if cache is not None else None
+    if data is None:
+        data = render_page_image(doc, page_num, fmt, quality, max_width)
+        if cache is not None:
+            cache.set(key, data)
+    return data
+
+
+def get_page_png(doc: OpenDocument, page_num: int, zoom: float,
+                 cache: Optional[TieredCache] = page_cache) -> bytes:
+    """Sayfa PNG'sini önbellekten döndür, yoksa rasterize edip önbelleğe koy."""
+    if cache is None:
+        return render_page_png(doc, page_num, zoom)
+    key = page_cache_key(doc.doc_id, page_num, zoom, "png")
+    data = cache.get(key)
+    if data is None:
+        data = render_page_png(doc, page_num, zoom)
+        cache.set(key, data)
+    return data
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from app.docs.preprocess import sniff_mime
+from app.docs.registry import OpenDocument
+
+logger = logging.getLogger("furijapan")
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DocumentStore:
+    """Yüklenen dosyaları SHA-256 özetine göre diskte saklayan ortak depo.
+
+    Tüm gunicorn worker'ları aynı klasörü görür; bir worker'ın kaydettiği
+    belge diğerlerinde özetle açılabilir. Aynı içerik ikinci kez yazılmaz.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def is_valid_digest(digest: Optional[str]) -> bool:
+        return bool(digest) and bool(_DIGEST_RE.match(digest))
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _meta_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def path_for(self, digest: str) -> Optional[Path]:
+        if not self.is_valid_digest(digest):
+            return None
+        path = self._object_path(digest)
+        return path if path.exists() else None
+
+    def contains(self, digest: str) -> bool:
+        return self.path_for(digest) is not None
+
+    def new_upload(self) -> Tuple[int, Path]:
+        """Akışla gelen yükleme için depo diskinde geçici dosya aç: (fd, yol)."""
+        incoming = self.root / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(incoming), suffix=".upload")
+        return fd, Path(tmp_path)
+
+    def put_file(self, tmp_path: Path, digest: str, filename: Optional[str],
+                 is_pdf: bool, size: int) -> str:
+        """Özeti önceden hesaplanmış geçici dosyayı kopyalamadan depoya taşı."""
+        path = self._object_path(digest)
+        if path.exists():
+            os.unlink(tmp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        self._write_meta(digest, filename, is_pdf, size)
+        return digest
+
+    def _write_meta(self, digest: str, filename: Optional[str], is_pdf: bool, size: int):
+        if not self._meta_path(digest).exists():
+            meta = {"filename": filename, "is_pdf": is_pdf, "size": size}
+            self._atomic_write(self._meta_path(digest), json.dumps(meta).encode("utf-8"))
+
+    def meta(self, digest: str) -> Optional[dict]:
+        if not self.is_valid_digest(digest):
+            return None
+        try:
+            with open(self._meta_path(digest), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def remove(self, digest: str):
+        """Belgeyi ve meta verisini depodan sil (açılamayan yüklemeler için)."""
+        if not self.is_valid_digest(digest):
+            return
+        for path in (self._object_path(digest), self._meta_path(digest)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def open(self, digest: str) -> Optional[OpenDocument]:
+        """Depodaki belgeyi aç. Kayıt (registry) için yükleyici olarak kullanılır."""
+        path = self.path_for(digest)
+        meta = self.meta(digest)
+        if path is None or meta is None:
+            return None
+
+        if meta.get("is_pdf"):
+            # MuPDF dosyayı tembel okur; sayfalar işletim sisteminin ortak
+            # sayfa önbelleğinden gelir, bellekte ikinci kopya tutulmaz.
+            pdf = fitz.open(str(path))
+            return OpenDocument(
+                digest,
+                meta.get("filename"),
+                is_pdf=True,
+                pdf=pdf,
+                path=str(path),
+                size=meta.get("size", 0)
+            )
+
+        # Orijinal baytlar olduğu gibi tutulur; çözme/küçültme ancak bir
+        # önizleme veya OCR varyantı istendiğinde yapılır (render, preprocess)
+        with open(path, "rb") as f:
+            data = f.read()
+        return OpenDocument(
+            digest,
+            meta.get("filename"),
+            is_pdf=False,
+            image=data,
+            path=str(path),
+            size=len(data),
+            mime=sniff_mime(data)
+        )
+
+    def _atomic_write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Aynı anda yazan worker'lar aynı içeriği yazar; replace atomiktir
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+def probe_image(path) -> str:
+    """Dosyanın resim olduğunu yalnızca başlığından doğrula ve biçimini döndür.
+
+    PIL ``open`` piksel verisini çözmez; bozuk/desteklenmeyen dosyada hata verir.
+    """
+    with Image.open(path) as img:
+        return img.format
+
+
+def probe_pdf(path) -> int:
+    """Dosyanın açılabilir bir PDF olduğunu doğrula ve sayfa sayısını döndür."""
+    with fitz.open(str(path), filetype="pdf") as pdf:
+        if not pdf.is_pdf or pdf.page_count == 0:
+            raise ValueError("geçerli bir PDF değil")
+        return pdf.page_count
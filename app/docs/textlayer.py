@@ -0,0 +1,218 @@
+import re
+import logging
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+from app import config
+from app.docs.registry import OpenDocument
+
+logger = logging.getLogger("furijapan")
+
+
+def _is_japanese(ch: str) -> bool:
+    return (
+        "\u3040" <= ch <= "\u30ff"  # hiragana, katakana
+        or "\u4e00" <= ch <= "\u9fff"
+        or "\u3400" <= ch <= "\u4dbf"
+        or "\u3000" <= ch <= "\u303f"  # 、。「」 gibi işaretler
+        or "\uff00" <= ch <= "\uffef"  # tam genişlikli karakterler
+    )
+
+
+def _is_garbage(ch: str) -> bool:
+    # ToUnicode tablosu eksik fontlar bu karakterleri üretir
+    return (
+        ch == "\ufffd"
+        or "\ue000" <= ch <= "\uf8ff"
+        or (ch < " " and ch not in "\n\t")
+    )
+
+
+# Taban yazının bu oranından küçük yazılar furigana (ruby) sayılır
+RUBY_SIZE_RATIO = 0.7
+
+_JP = "\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef"
+# Japonca karakterler arasındaki yerleşim boşlukları (ruby hizalaması vb.)
+_LAYOUT_SPACE_RE = re.compile(f"(?<=[{_JP}])[^\\S\\n]+(?=[{_JP}])")
+
+
+def _line_items(page: fitz.Page) -> list:
+    """Boş olmayan satırlar: (bbox, dikey mi, yazı boyu, metin).
+
+    Satır içinde taban yazıdan belirgin küçük span'ler (ruby) atılır.
+    """
+    items = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            size = max(span["size"] for span in spans)
+            text = "".join(
+                span["text"] for span in line["spans"] if span["size"] >= size * RUBY_SIZE_RATIO
+            )
+            vertical = abs(line["dir"][1]) > abs(line["dir"][0])
+            items.append((line["bbox"], vertical, size, text))
+    return items
+
+
+def _is_ruby(item, base) -> bool:
+    """``item`` satırı ``base`` satırının furiganası mı?
+
+    Ruby taban yazıdan küçüktür ve ona bitişiktir: yatay yazıda hemen
+    üstünde, dikey yazıda hemen sağında durur.
+    """
+    (x0, y0, x1, y1), vertical, size, _ = item
+    (bx0, by0, bx1, by1), base_vertical, base_size, _ = base
+    if vertical != base_vertical or size >= base_size * RUBY_SIZE_RATIO:
+        return False
+    gap = base_size * 0.5
+    if vertical:
+        return min(y1, by1) > max(y0, by0) and -gap <= x0 - bx1 <= gap
+    return min(x1, bx1) > max(x0, bx0) and -gap <= by0 - y1 <= gap
+
+
+def _drop_ruby(items: list) -> list:
+    largest = max(size for _, _, size, _ in items)
+    return [
+        item for item in items
+        if item[2] >= largest * RUBY_SIZE_RATIO
+        or not any(_is_ruby(item, base) for base in items if base is not item)
+    ]
+
+
+def _group(items: list, axis: int) -> list:
+    """Satırları ``axis`` ekseninde (0: x, 1: y) örtüşenler bir arada olacak şekilde grupla."""
+    groups = []  # [alt sınır, üst sınır, satırlar]
+    for item in items:
+        lo, hi = item[0][axis], item[0][axis + 2]
+        for group in groups:
+            overlap = min(hi, group[1]) - max(lo, group[0])
+            if overlap > min(hi - lo, group[1] - group[0]) * 0.5:
+                group[0], group[1] = min(lo, group[0]), max(hi, group[1])
+                group[2].append(item)
+                break
+        else:
+            groups.append([lo, hi, [item]])
+    return groups
+
+
+def _normalize_spaces(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return _LAYOUT_SPACE_RE.sub("", text)
+
+
+def extract_text(page: fitz.Page) -> str:
+    """Sayfanın gömülü metin katmanını okuma sırasıyla çıkar.
+
+    Furigana (ruby) okumaları atılır. Satırların çoğu dikeyse (tategaki)
+    x'te örtüşen satırlar bir sütunda birleştirilir; sütunlar sağdan sola,
+    her sütun yukarıdan aşağı okunur ve yalnızca sütunlar arasında satır
+    kırılır. Yatay yazıda y'de örtüşen satırlar soldan sağa birleştirilir.
+    Japonca karakterler arasındaki yerleşim boşlukları kaldırılır.
+    """
+    items = _line_items(page)
+    if not items:
+        return ""
+    items = _drop_ruby(items)
+
+    vertical = [item for item in items if item[1]]
+    if len(vertical) * 2 > len(items):
+        # Başlık/sayfa numarası gibi yatay satırlar sütunlardan sonra gelir
+        columns = sorted(_group(vertical, 0), key=lambda g: -g[1])
+        rows = [sorted(lines, key=lambda l: l[0][1]) for _, _, lines in columns]
+        rows += [[item] for item in items if not item[1]]
+    else:
+        rows = [
+            sorted(lines, key=lambda l: l[0][0])
+            for _, _, lines in sorted(_group(items, 1), key=lambda g: g[0])
+        ]
+    texts = (_normalize_spaces("".join(l[3] for l in row)) for row in rows)
+    return "\n".join(text for text in texts if text)
+
+
+def text_is_usable(text: str) -> bool:
+    """Metin katmanı görsel OCR yerine kullanılabilecek kalitede mi?
+
+    Çok kısa metinler (taranmış sayfalardaki başlık/sayfa numarası), bozuk
+    font eşlemesinden gelen karakterler, Japonca oranı düşük metinler ve
+    furigana okumalarının taban metne karıştığı metinler reddedilir.
+    """
+    chars = [ch for ch in text if not ch.isspace()]
+    if len(chars) < config.TEXT_LAYER_MIN_CHARS:
+        return False
+    if _is_garbled(chars):
+        return False
+    japanese = sum(_is_japanese(ch) for ch in chars)
+    if japanese < len(chars) * 0.3:
+        return False
+    return not _has_interleaved_ruby(text, japanese)
+
+
+def _is_garbled(chars) -> bool:
+    return sum(_is_garbage(ch) for ch in chars) > len(chars) * 0.02
+
+
+def _has_interleaved_ruby(text: str, japanese: int) -> bool:
+    """Ruby satırları/yerleşim boşlukları ayıklanamamış metin mi?
+
+    İki belirti aranır: Japonca karakterlerin arasına dağılmış boşluklar
+    (ruby'yi tabanına hizalayan yerleşim) ve kanjili satırın hemen
+    üstünde duran yalnızca hiragana satırları (okumaların kendisi).
+    """
+    if len(_LAYOUT_SPACE_RE.findall(text)) > japanese * 0.05:
+        return True
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    readings = sum(
+        1 for line, next_line in zip(lines, lines[1:])
+        if all("\u3040" <= ch <= "\u309f" or ch.isspace() for ch in line)
+        and any("\u4e00" <= ch <= "\u9fff" for ch in next_line)
+    )
+    return readings >= 3 and readings * 4 > len(lines)
+
+
+def page_text(page: fitz.Page) -> Optional[str]:
+    """Kullanılabilir metin katmanı varsa onu, yoksa None döndür."""
+    if not config.TEXT_LAYER_OCR:
+        return None
+    try:
+        text = extract_text(page).strip()
+    except Exception as e:
+        logger.debug(f"Metin katmanı okunamadı: {e}")
+        return None
+    return text if text_is_usable(text) else None
+
+
+def document_page_text(doc: OpenDocument, page_num: int) -> Optional[str]:
+    """Açık belgenin sayfası için ``page_text`` (bloklayan çağrı, thread'de çalıştır)."""
+    if not doc.is_pdf:
+        return None
+    with doc.lock:
+        return page_text(doc.pdf.load_page(page_num))
+
+
+def document_page_blocks(doc: OpenDocument, page_num: int, zoom: float) -> list:
+    """Metin katmanındaki blokların ``zoom``'la rasterize edilmiş sayfadaki kutuları.
+
+    Yalnızca metin katmanı bozuk font eşlemesi yüzünden reddedilmişse
+    kullanılır: o zaman metin okunamaz ama blok konumları sayfanın tüm
+    içeriğini doğru kapsar. Sayfada resim varsa (taranmış sayfa) veya metin
+    çok kısaysa (sadece sayfa numarası/başlık) bloklar içeriği kapsamaz;
+    boş liste döner ve bölge OCR'ı projeksiyonla çalışır.
+    """
+    if not doc.is_pdf:
+        return []
+    with doc.lock:
+        page = doc.pdf.load_page(page_num)
+        if page.get_images():
+            return []
+        chars = [ch for ch in extract_text(page) if not ch.isspace()]
+        if len(chars) < config.TEXT_LAYER_MIN_CHARS or not _is_garbled(chars):
+            return []
+        blocks = page.get_text("blocks")
+    return [
+        (int(x0 * zoom), int(y0 * zoom), int(x1 * zoom) + 1, int(y1 * zoom) + 1)
+        for x0, y0, x1, y1, text, _, block_type in blocks
+        if block_type == 0 and text.strip()
+    ]
@@ -0,0 +1,226 @@
+import os
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse
+
+from app import config
+from app.docs.store import DocumentStore
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger("furijapan")
+
+# Multipart sarmalayıcısı (sınırlar, parça başlıkları) için pay
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(Exception):
+    """Yükleme kabul edilmedi; ``status_code`` ve kullanıcıya gösterilecek mesaj taşır."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self):
+        super().__init__(
+            413, f"Dosya çok büyük (en fazla {config.UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"
+        )
+
+
+def upload_error_response(error: UploadError) -> JSONResponse:
+    return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+
+
+class UploadLimitMiddleware:
+    """Yükleme gövdesini sayarak sınırı aşan isteği erkenden 413 ile keser.
+
+    Content-Length sınırı aşıyorsa gövde hiç okunmaz. Başlık yoksa
+    (chunked) gelen baytlar sayılır; sınır aşıldığında uygulamaya bağlantı
+    kopmuş gibi ``http.disconnect`` verilir, diske sınırdan fazlası yazılmaz.
+    Uygulamanın o istek için ürettiği yanıt (veya hata) atılır, yerine 413
+    gönderilir. Hata ``receive`` içinden yükseltilmez: BaseHTTPMiddleware
+    katmanları onu TaskGroup içinde ExceptionGroup'a sarıp 500'e çevirir.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.limit = max_bytes + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.limit:
+            await upload_error_response(UploadTooLarge())(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if exceeded and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await upload_error_response(UploadTooLarge())(scope, receive, send)
+
+
+class ReceivedUpload:
+    """Depo diskine akıtılmış, henüz depoya alınmamış yükleme."""
+
+    def __init__(self, tmp_path: Path, digest: str, size: int, head: bytes,
+                 filename: Optional[str]):
+        self.tmp_path = tmp_path
+        self.digest = digest
+        self.size = size
+        self.head = head
+        self.filename = filename
+
+
+class _FilePartCollector:
+    """MultipartParser geri çağrıları: yalnızca ``field`` dosya alanının verisini toplar."""
+
+    def __init__(self, field: str):
+        self.field = field.encode("latin-1")
+        self.filename: Optional[str] = None
+        self.found = False
+        self.data: List[bytes] = []
+        self._in_file = False
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # İlk eşleşen dosya alanı alınır, diğer alanlar atlanır
+        if not self.found and options.get(b"name") == self.field and b"filename" in options:
+            self.found = True
+            self._in_file = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.data.append(data[start:end])
+
+    def _on_part_end(self):
+        self._in_file = False
+
+
+async def receive_upload(request: Request, store: DocumentStore, field: str = "file") -> ReceivedUpload:
+    """Multipart isteğin dosya alanını gövdeyi okurken depo diskine yaz.
+
+    Gövde ağdan geldikçe ayrıştırılır; dosya verisi geçici bir kopyaya
+    uğramadan ``store.new_upload()`` dosyasına yazılır, yazarken SHA-256
+    özeti çıkarılır. Bellekte en fazla UPLOAD_CHUNK_BYTES kadar veri tutulur.
+    Hatalarda geçici dosya silinir ve ``UploadError`` yükselir.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError(400, "Dosya multipart/form-data olarak gönderilmeli")
+
+    collector = _FilePartCollector(field)
+    parser = MultipartParser(boundary, collector.callbacks())
+    fd, tmp_path = store.new_upload()
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+    pending: List[bytes] = []
+    buffered = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except ValueError as e:  # Bozuk multipart gövdesi
+                    raise UploadError(400, f"Geçersiz yükleme gövdesi: {e}")
+                for data in collector.data:
+                    size += len(data)
+                    if size > config.UPLOAD_MAX_BYTES:
+                        raise UploadTooLarge()
+                    if len(head) < 16:
+                        head += data[:16 - len(head)]
+                    hasher.update(data)
+                    buffered += len(data)
+                pending.extend(collector.data)
+                collector.data = []
+                if buffered >= config.UPLOAD_CHUNK_BYTES:
+                    await run_in_threadpool(out.writelines, pending)
+                    pending = []
+                    buffered = 0
+            parser.finalize()
+            if pending:
+                await run_in_threadpool(out.writelines, pending)
+    except ClientDisconnect:
+        # İstemci koptu ya da UploadLimitMiddleware sınır aşımında okumayı kesti
+        tmp_path.unlink(missing_ok=True)
+        raise UploadError(400, "Yükleme yarıda kesildi")
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if not collector.found:
+        tmp_path.unlink(missing_ok=True)
+        raise UploadError(400, f"'{field}' dosya alanı bulunamadı")
+    return ReceivedUpload(tmp_path, hasher.hexdigest(), size, head, collector.filename)
@@ -0,0 +1,247 @@
+import re
+import html
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app import config
+
+logger = logging.getLogger("furijapan")
+
+DEFAULT_DICTIONARY = Path(__file__).resolve().parent / "dictionary.tsv"
+
+# Fiil ve sıfat çekim kökleri: sözlük biçiminin son hecesi -> çekimde gelebilecek heceler
+_GODAN_ENDINGS = {
+    "う": "わいうえおっ",
+    "く": "かきくけこい",
+    "ぐ": "がぎぐげごい",
+    "す": "さしすせそ",
+    "つ": "たちつてとっ",
+    "ぬ": "なにぬねのん",
+    "ぶ": "ばびぶべぼん",
+    "む": "まみむめもん",
+    "る": "らりるれろっ",
+}
+_ADJ_ENDINGS = "いくかけさそすみ"
+
+
+def is_kanji(ch: str) -> bool:
+    return (
+        "一" <= ch <= "鿿"
+        or "㐀" <= ch <= "䶿"
+        or ch in "々〆ヶ"
+    )
+
+
+def is_hiragana(ch: str) -> bool:
+    return "ぁ" <= ch <= "ゟ"
+
+
+def to_hiragana(text: str) -> str:
+    return "".join(
+        chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch
+        for ch in text
+    )
+
+
+class ReadingDictionary:
+    """Yazım -> okunuş sözlüğü; en uzun eşleşme için karakter trie'si."""
+
+    def __init__(self):
+        self._root: dict = {}
+        self.size = 0
+
+    def add(self, surface: str, reading: str, needs_okurigana: bool = False):
+        node = self._root
+        for ch in surface:
+            node = node.setdefault(ch, {})
+        entry = node.setdefault("", {"readings": [], "needs_okurigana": needs_okurigana})
+        if reading not in entry["readings"]:
+            entry["readings"].append(reading)
+            self.size += 1
+
+    def add_word(self, surface: str, readings: List[str], pos: str = ""):
+        """Sözlük biçimini ekle; fiil/sıfat ise çekim köklerini de üret."""
+        for reading in readings:
+            if pos == "v1":
+                # İchidan: 食べる -> 食べ (ます, た, て, ない ...)
+                self.add(surface[:-1], reading[:-1], needs_okurigana=True)
+                self.add(surface, reading)
+            elif pos == "v5" and surface[-1] in _GODAN_ENDINGS:
+                for kana in _GODAN_ENDINGS[surface[-1]]:
+                    self.add(surface[:-1] + kana, reading[:-1] + kana)
+            elif pos == "adj" and surface.endswith("い"):
+                for kana in _ADJ_ENDINGS:
+                    self.add(surface[:-1] + kana, reading[:-1] + kana)
+            else:
+                self.add(surface, reading)
+
+    def load_tsv(self, path):
+        """``yazım<TAB>okunuş[|okunuş2][<TAB>tür]`` satırlarını yükle (# yorum)."""
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                cols = line.split("\t")
+                if len(cols) < 2:
+                    continue
+                readings = [to_hiragana(r) for r in cols[1].split("|") if r]
+                pos = cols[2] if len(cols) > 2 else ""
+                self.add_word(cols[0], readings, pos)
+
+    def longest_match(self, text: str, start: int) -> Optional[Tuple[int, List[str]]]:
+        """``start`` konumundan başlayan en uzun kaydı (uzunluk, okunuşlar) olarak döndür."""
+        node = self._root
+        best = None
+        i = start
+        while i < len(text) and text[i] in node:
+            node = node[text[i]]
+            i += 1
+            entry = node.get("")
+            if entry is None:
+                continue
+            if entry["needs_okurigana"] and not (i < len(text) and is_hiragana(text[i])):
+                continue
+            best = (i - start, entry["readings"])
+        return best
+
+
+def align_reading(surface: str, reading: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """Okunuşu yazımın kanji parçalarına dağıt: 食べ/たべ -> [(食, た), (べ, None)]."""
+    runs = re.findall(r"[^ぁ-ゟ]+|[ぁ-ゟ]+", surface)
+    pattern = "".join(
+        re.escape(run) if is_hiragana(run[0]) else "(.+?)"
+        for run in runs
+    )
+    match = re.fullmatch(pattern, reading)
+    if match is None:
+        return None
+    groups = iter(match.groups())
+    return [
+        (run, None) if is_hiragana(run[0]) else (run, next(groups))
+        for run in runs
+    ]
+
+
+class FuriganaEngine:
+    """Sözlükle yerel furigana üretir; belirsiz kelimeleri dışarıya sorar."""
+
+    def __init__(self, dictionary: ReadingDictionary, max_unknown_ratio: float = 0.5):
+        self.dictionary = dictionary
+        self.max_unknown_ratio = max_unknown_ratio
+
+    def analyze(self, text: str) -> List[tuple]:
+        """Metni parçala: ("text", s) | ("word", yazım, okunuş) | ("unknown", yazım)."""
+        segments = []
+        i = 0
+        plain = []
+        while i < len(text):
+            ch = text[i]
+            if not is_kanji(ch):
+                plain.append(ch)
+                i += 1
+                continue
+            if plain:
+                segments.append(("text", "".join(plain)))
+                plain = []
+
+            match = self.dictionary.longest_match(text, i)
+            if match is not None and len(match[1]) == 1:
+                length, readings = match
+                segments.append(("word", text[i:i + length], readings[0]))
+                i += length
+                continue
+
+            if match is not None:
+                # Birden fazla okunuş: bağlama göre karar verilmeli
+                length = match[0]
+            else:
+                # Sözlükte yok: bitişik kanjileri tek belirsiz parça olarak topla
+                length = 1
+                while i + length < len(text) and is_kanji(text[i + length]) \
+                        and self.dictionary.longest_match(text, i + length) is None:
+                    length += 1
+            if segments and segments[-1][0] == "unknown" and match is None:
+                segments[-1] = ("unknown", segments[-1][1] + text[i:i + length])
+            else:
+                segments.append(("unknown", text[i:i + length]))
+            i += length
+        if plain:
+            segments.append(("text", "".join(plain)))
+        return segments
+
+    @staticmethod
+    def _ruby(base: str, reading: str) -> str:
+        return f"<ruby>{html.escape(base, quote=False)}<rt>{html.escape(reading, quote=False)}</rt></ruby>"
+
+    def render(self, segments: List[tuple], resolved: Dict[str, str]) -> str:
+        out = []
+        for seg in segments:
+            if seg[0] == "text":
+                out.append(html.escape(seg[1], quote=False))
+                continue
+            surface = seg[1]
+            reading = seg[2] if seg[0] == "word" else resolved.get(surface)
+            if not reading:
+                out.append(html.escape(surface, quote=False))
+                continue
+            parts = align_reading(surface, to_hiragana(reading))
+            if parts is None:
+                out.append(self._ruby(surface, reading))
+                continue
+            for base, part_reading in parts:
+                if part_reading is None:
+                    out.append(html.escape(base, quote=False))
+                else:
+                    out.append(self._ruby(base, part_reading))
+        return "".join(out)
+
+    def to_ruby_html(self, text: str,
+                     resolve: Optional[Callable[[str, List[str]], Dict[str, str]]] = None) -> Optional[str]:
+        """Metni <ruby> HTML'ine çevir.
+
+        Sözlükte net okunuşu olmayan kelimeler ``resolve(metin, kelimeler)`` ile
+        (örn. LLM'e) sorulur. Belirsiz kısım çok fazlaysa veya çözülemezse
+        None döner; çağıran tüm metni LLM'e gönderir.
+        """
+        segments = self.analyze(text)
+        unknown = list(dict.fromkeys(seg[1] for seg in segments if seg[0] == "unknown"))
+        resolved: Dict[str, str] = {}
+        if unknown:
+            kanji_total = sum(is_kanji(ch) for ch in text)
+            kanji_unknown = sum(
+                sum(is_kanji(ch) for ch in seg[1]) for seg in segments if seg[0] == "unknown"
+            )
+            if resolve is None or kanji_unknown > kanji_total * self.max_unknown_ratio:
+                return None
+            try:
+                resolved = resolve(text, unknown)
+            except Exception as e:
+                logger.error(f"Okunuş çözümleme hatası: {e}")
+                return None
+            if any(word not in resolved for word in unknown):
+                return None
+        return self.render(segments, resolved)
+
+
+_engine: Optional[FuriganaEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> FuriganaEngine:
+    """Paketle gelen sözlük (ve varsa FURIGANA_DICT) ile süreç genelinde tek motor."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            dictionary = ReadingDictionary()
+            dictionary.load_tsv(DEFAULT_DICTIONARY)
+            if config.FURIGANA_DICT:
+                try:
+                    dictionary.load_tsv(config.FURIGANA_DICT)
+                except OSError as e:
+                    logger.error(f"Furigana sözlüğü okunamadı ({config.FURIGANA_DICT}): {e}")
+            logger.info(f"Furigana sözlüğü yüklendi: {dictionary.size} kayıt")
+            _engine = FuriganaEngine(dictionary, config.FURIGANA_MAX_UNKNOWN_PERCENT / 100)
+        return _engine
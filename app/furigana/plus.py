@@ -0,0 +1,52 @@
+import re
+
+# Etiket veya etiketler arası metin; HTML tek geçişte bu parçalara ayrılır
+_TOKEN_RE = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>|[^<]+|<")
+
+
+def first_occurrence_only(html: str) -> str:
+    """Plus modu: her kanji kelimesinin yalnızca ilk geçtiği yerde furigana bırak.
+
+    Normal <ruby> çıktısını tek geçişte tarar; tabanı (rt/rp dışındaki metin)
+    daha önce görülmüş <ruby> bloklarını düz metin olarak yazar.
+    """
+    seen = set()
+    out = []
+    ruby = None  # Açık <ruby> bloğunun ham parçaları
+    base = []
+    plain = []  # Aynı bloğun rt/rp olmadan hali
+    skip_depth = 0  # <rt>/<rp> içindeyken > 0
+
+    for match in _TOKEN_RE.finditer(html):
+        token = match.group(0)
+        closing, tag = match.group(1), (match.group(2) or "").lower()
+
+        if ruby is None:
+            if tag == "ruby" and not closing:
+                ruby, base, plain, skip_depth = [token], [], [], 0
+            else:
+                out.append(token)
+            continue
+
+        ruby.append(token)
+        if tag == "ruby" and closing:
+            word = "".join(base).strip()
+            if word and word in seen:
+                out.append("".join(plain))
+            else:
+                seen.add(word)
+                out.extend(ruby)
+            ruby = None
+        elif tag in ("rt", "rp"):
+            skip_depth += -1 if closing else 1
+            skip_depth = max(skip_depth, 0)
+        elif skip_depth == 0:
+            if not tag:
+                base.append(token)
+            if tag != "rb":
+                plain.append(token)
+
+    if ruby is not None:
+        # Kapanmamış blok: olduğu gibi bırak
+        out.extend(ruby)
+    return "".join(out)
@@ -20,7 +20,7 @@ from PyQt6.QtWidgets import (
 
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
 
-from app.llm.client import AIClient
+from app.llm.client import get_shared_client
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
@@ -35,8 +35,8 @@ class AutomationWorker(QThread):
 
     def run(self):
         try:
-            # AIClient'ı burada başlatmak, QSettings'den anahtarı almasını sağlar
-            ai = AIClient() 
+            # Paylaşılan istemci, QSettings'deki anahtar değişirse kendini yeniler
+            ai = get_shared_client()
             result = ai.get_ruby_html_text(self.source_text, mode=self.mode)
             self.finished.emit(result)
         except Exception as e:
@@ -52,7 +52,7 @@ class AudioWorker(QThread):
 
     def run(self):
         try:
-            ai = AIClient()
+            ai = get_shared_client()
             audio_data = ai.generate_speech(self.text)
             self.finished.emit(audio_data)
         except Exception as e:
@@ -339,7 +339,7 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Asistan yanıtlıyor...")
         QApplication.processEvents()
         try:
-            ai = AIClient()
+            ai = get_shared_client()
             answer = ai.get_assistant_response(context_data, user_question)
             current_text = self.txt_output.toMarkdown()
             separator = "\n\n---\n### 💡 Asistan Yanıtı\n"
@@ -403,6 +403,15 @@ class MainWindow(QMainWindow):
         self.update_text_font()
 
     def process_with_ai(self):
+        # Dijital PDF: gömülü metin katmanı iyiyse API'ye gitmeden kullan
+        if self.pdf_doc:
+            from app.docs.textlayer import page_text
+            text = page_text(self.pdf_doc.load_page(self.current_page))
+            if text is not None:
+                self.txt_source.setPlainText(text)
+                self.status_bar.showMessage("Metin PDF'in metin katmanından okundu.")
+                return
+
         ai = self.get_ai_client() # Güvenli başlatma
         if not ai: return # Kullanıcı iptal ettiyse çık
 
@@ -498,16 +507,16 @@ class MainWindow(QMainWindow):
         if txt: 
             self.status_bar.showMessage("Kelimeler analiz ediliyor...")
             QApplication.processEvents()
-            self.txt_output.setMarkdown(AIClient().get_word_list_analysis(txt))
+            self.txt_output.setMarkdown(get_shared_client().get_word_list_analysis(txt))
             self.status_bar.showMessage("Analiz bitti.")
 
     def process_analysis(self):
         txt = self.txt_source.toPlainText()
-        if txt: self.txt_output.setMarkdown(AIClient().analyze_japanese_text(txt))
+        if txt: self.txt_output.setMarkdown(get_shared_client().analyze_japanese_text(txt))
 
     def process_furigana(self):
         txt = self.txt_source.toPlainText()
-        if txt: self.txt_output.setPlainText(AIClient().get_furigana_text(txt))
+        if txt: self.txt_output.setPlainText(get_shared_client().get_furigana_text(txt))
 
     def load_settings(self):
         settings = QSettings("MyJapaneseApp", "Layout")
@@ -532,7 +541,7 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Metin asistanı yanıtlıyor...")
         QApplication.processEvents()
         try:
-            ai = AIClient()
+            ai = get_shared_client()
             answer = ai.get_assistant_response(context_data, user_question)
             current_text = self.txt_output.toMarkdown()
             separator = "\n\n---\n### 📝 Metin Analiz Yanıtı\n"
@@ -609,11 +618,11 @@ class MainWindow(QMainWindow):
     def get_ai_client(self):
         """AIClient'ı güvenli bir şekilde başlatır, anahtar yoksa kullanıcıya sorar."""
         try:
-            return AIClient()
+            return get_shared_client()
         except ValueError as e:
             if str(e) == "API_KEY_MISSING":
                 if self.prompt_for_api_key():
-                    return AIClient() # Anahtar girildiyse tekrar dene
+                    return get_shared_client() # Anahtar girildiyse tekrar dene
             return None
 
     def prompt_for_api_key(self):
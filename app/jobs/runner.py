@@ -0,0 +1,138 @@
+import os
+import uuid
+import asyncio
+import logging
+import socket
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.jobs.store import JobStore
+
+logger = logging.getLogger("furijapan")
+
+# İş kalemi işleyicisi: (iş, sayfa) -> kaydedilecek sonuç
+ItemHandler = Callable[[dict, int], Awaitable[dict]]
+
+
+class JobRunner:
+    """Worker içinde kuyruktan iş alıp kalemlerini paralel işleyen arka plan görevi.
+
+    Her worker'da bir tane çalışır; aynı anda bir iş alır, işin kalemlerini
+    en fazla ``concurrency`` paralel işler. İşi tutan worker düzenli sinyal
+    (heartbeat) yazar; sinyal kesilirse iş başka worker'a geçer.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, ItemHandler], concurrency: int = 4,
+                 poll_interval: float = 2.0, stale_after: float = 60.0):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._current: Optional[str] = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._loop())
+
+    def wake(self):
+        """Yeni iş eklendi; beklemeden kuyruğa bak."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._current is not None:
+            # Yarım kalan iş diğer worker'lar için hemen kuyruğa döner
+            await asyncio.to_thread(self.store.release, self._current, self.owner)
+            self._current = None
+
+    async def _loop(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.owner, self.stale_after)
+            except Exception as e:
+                logger.error(f"İş kuyruğu okunamadı: {e}")
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Örn. SQLite kilitli kaldı; görev ölmesin, iş kuyruğa dönsün
+                logger.error(f"İş yürütülemedi ({job['id']}): {e}", exc_info=True)
+                self._current = None
+                try:
+                    await asyncio.to_thread(self.store.release, job["id"], self.owner)
+                except Exception as e:
+                    logger.error(f"İş kuyruğa bırakılamadı ({job['id']}): {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: dict):
+        job_id = job["id"]
+        self._current = job_id
+        handler = self.handlers.get(job["kind"])
+        items = await asyncio.to_thread(self.store.pending_items, job_id)
+        logger.info(f"İş başladı: {job_id} ({job['kind']}, {len(items)}/{job['total']} kalem)")
+
+        lost = asyncio.Event()
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id, lost))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_item(item: int):
+            async with semaphore:
+                if lost.is_set():
+                    return
+                try:
+                    if handler is None:
+                        raise ValueError(f"Bilinmeyen iş türü: {job['kind']}")
+                    result = await handler(job, item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"İş kalemi hatası ({job_id}, sayfa {item}): {e}")
+                    await asyncio.to_thread(self.store.fail_item, job_id, item, str(e))
+                else:
+                    await asyncio.to_thread(self.store.complete_item, job_id, item, result)
+
+        tasks = [asyncio.ensure_future(run_item(item)) for item in items]
+        try:
+            await asyncio.gather(*tasks)
+            if not lost.is_set():
+                await asyncio.to_thread(self.store.finish, job_id, self.owner)
+                logger.info(f"İş bitti: {job_id}")
+            # İptal edilirse (worker kapanıyor) stop() işi kuyruğa geri bırakır
+            self._current = None
+        finally:
+            heartbeat.cancel()
+            # Bir kalem kaydedilemezse (veritabanı hatası) diğerleri başıboş kalmasın
+            for task in tasks:
+                task.cancel()
+
+    async def _heartbeat(self, job_id: str, lost: asyncio.Event):
+        while True:
+            await asyncio.sleep(self.stale_after / 4)
+            try:
+                alive = await asyncio.to_thread(self.store.heartbeat, job_id, self.owner)
+            except Exception as e:
+                logger.error(f"İş sinyali yazılamadı ({job_id}): {e}")
+                continue
+            if not alive:
+                logger.warning(f"İş başka bir worker'a geçti: {job_id}")
+                lost.set()
+                return
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger("furijapan")
+
+
+class JobStore:
+    """Uzun OCR/furigana/seslendirme işleri için SQLite kuyruğu.
+
+    Her iş (job) sayfa başına bir kalem (item) içerir; biten kalemin sonucu
+    hemen yazılır. Worker yeniden başlasa veya bağlantı kopsa da iş kaybolmaz:
+    sahibi ``stale_after`` saniyedir sinyal vermeyen iş başka bir worker
+    tarafından devralınır ve yalnızca bitmemiş kalemler işlenir.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, doc_id TEXT NOT NULL,"
+            " params TEXT NOT NULL, status TEXT NOT NULL,"
+            " owner TEXT, heartbeat REAL,"
+            " created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            " job_id TEXT NOT NULL, item INTEGER NOT NULL, status TEXT NOT NULL,"
+            " result TEXT, error TEXT, updated REAL NOT NULL,"
+            " PRIMARY KEY (job_id, item))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Bağlantı thread ve süreç başına açılır (gunicorn fork sonrası yeniden)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, kind: str, doc_id: str, items: Iterable[int], params: Optional[dict] = None) -> dict:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs(id, kind, doc_id, params, status, created, updated)"
+                " VALUES(?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, doc_id, json.dumps(params or {}), now, now)
+            )
+            conn.executemany(
+                "INSERT INTO job_items(job_id, item, status, updated) VALUES(?, ?, 'pending', ?)",
+                [(job_id, item, now) for item in items]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id, kind, doc_id, params, status, created, updated FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+            (job_id,)
+        ).fetchall())
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "doc_id": row[2],
+            "params": json.loads(row[3]),
+            "status": row[4],
+            "created": row[5],
+            "updated": row[6],
+            "total": sum(counts.values()),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+        }
+
+    def results(self, job_id: str) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT item, status, result, error FROM job_items"
+            " WHERE job_id = ? AND status != 'pending' ORDER BY item",
+            (job_id,)
+        ).fetchall()
+        results = []
+        for item, status, result, error in rows:
+            entry = {"page": item, "status": status}
+            if result is not None:
+                entry.update(json.loads(result))
+            if error is not None:
+                entry["error"] = error
+            results.append(entry)
+        return results
+
+    def claim(self, owner: str, stale_after: float) -> Optional[dict]:
+        """Sıradaki işi (veya sahibi düşmüş çalışan işi) bu worker'a al."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND heartbeat < ?)"
+                " ORDER BY created LIMIT 1",
+                (now - stale_after,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, updated = ?"
+                    " WHERE id = ?",
+                    (owner, now, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0]) if row is not None else None
+
+    def pending_items(self, job_id: str) -> List[int]:
+        """Henüz başarıyla bitmemiş kalemler (devralınan işte başarısızlar tekrar denenir)."""
+        rows = self._conn().execute(
+            "SELECT item FROM job_items WHERE job_id = ? AND status != 'done' ORDER BY item",
+            (job_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def complete_item(self, job_id: str, item: int, result: dict):
+        self._conn().execute(
+            "UPDATE job_items SET status = 'done', result = ?, error = NULL, updated = ?"
+            " WHERE job_id = ? AND item = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, item)
+        )
+
+    def fail_item(self, job_id: str, item: int, error: str):
+        self._conn().execute(
+            "UPDATE job_items SET status = 'failed', error = ?, updated = ?"
+            " WHERE job_id = ? AND item = ?",
+            (error, time.time(), job_id, item)
+        )
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        """İş hâlâ bu worker'daysa sinyal zamanını yenile."""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET heartbeat = ?, updated = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (now, now, job_id, owner)
+        )
+        return cur.rowcount == 1
+
+    def finish(self, job_id: str, owner: str):
+        """İşi kapat: hepsi bittiyse 'done', bazıları başarısızsa 'partial', hiçbiri bitmediyse 'failed'."""
+        self._conn().execute(
+            "UPDATE jobs SET owner = NULL, updated = ?, status = CASE"
+            "  WHEN NOT EXISTS (SELECT 1 FROM job_items WHERE job_id = jobs.id AND status != 'done')"
+            "   THEN 'done'"
+            "  WHEN EXISTS (SELECT 1 FROM job_items WHERE job_id = jobs.id AND status = 'done')"
+            "   THEN 'partial'"
+            "  ELSE 'failed' END"
+            " WHERE id = ? AND owner = ? AND status = 'running'",
+            (time.time(), job_id, owner)
+        )
+
+    def resume(self, job_id: str) -> bool:
+        """'partial'/'failed' işi kuyruğa geri koy; yalnızca bitmemiş kalemler yeniden işlenir."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated = ?"
+                " WHERE id = ? AND status IN ('partial', 'failed')",
+                (now, job_id)
+            )
+            resumed = cur.rowcount == 1
+            if resumed:
+                conn.execute(
+                    "UPDATE job_items SET status = 'pending', error = NULL, updated = ?"
+                    " WHERE job_id = ? AND status = 'failed'",
+                    (now, job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return resumed
+
+    def release(self, job_id: str, owner: str):
+        """Kapanan worker işi kuyruğa geri bırakır; başka worker hemen devralır."""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, updated = ?"
+            " WHERE id = ? AND owner = ? AND status = 'running'",
+            (time.time(), job_id, owner)
+        )
@@ -1,9 +1,32 @@
 import os
+import re
+import json
 import base64
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import httpx
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from app import config
+from app.cache.disk import make_key, named_cache
+from app.cache.singleflight import SingleFlight
+from app.llm.ratelimit import call_with_retry, estimate_tokens, stream_with_retry, vision_tokens
+from app.metrics import OCR_IMAGE_BYTES, observe_usage, track_ai
+from app.timing import phase
+from app.docs.preprocess import image_size, prepare_ocr_image, settings_key
+from app.furigana.engine import get_engine
+from app.furigana.plus import first_occurrence_only
+
+logger = logging.getLogger("furijapan")
+
 # 1. Önce sistem ortam değişkenlerini (Render/Codespaces Secrets) yükle
 # 2. Mevcut klasörde veya üst klasörlerde .env dosyası varsa onu da yükle
 load_dotenv() 
@@ -15,33 +38,133 @@ try:
 except ImportError:
     QT_AVAILABLE = False
 
+# Prompt değişirse sürümü artır; eski önbellek kayıtları kullanılmaz
+OCR_PROMPT = "Resimdeki Japonca metni çıkar. Sadece metni ver."
+OCR_PROMPT_VERSION = 1
+# Tam sayfa OCR çıktısı için üst sınır (kırpıntılarda daha azı istenir)
+OCR_MAX_TOKENS = 2000
+FURIGANA_PROMPT_VERSION = 1
+TTS_MODEL = "tts-1"
 
-class AIClient:
-    def __init__(self):
-        # API anahtarını hiyerarşik olarak ara:
-        # A) Sistem Değişkeni (Render Dashboard / GitHub Secrets)
-        self.api_key = os.getenv("OPENAI_API_KEY")
+_env_files_loaded = False
+
+# Aynı anda gelen özdeş OCR/furigana/TTS istekleri tek AI çağrısını bekler;
+# anahtarlar sonuç önbelleklerininkiyle aynıdır (ocr_key, furigana_key,
+# speech_key). Sunucu aynı kaydı executor.run_ai_shared ile async bekler.
+in_flight = SingleFlight()
+
+
+def ocr_cache():
+    return named_cache("ocr", config.OCR_CACHE_MAX_BYTES, config.OCR_CACHE_TTL)
+
+
+def furigana_cache():
+    return named_cache("furigana", config.FURIGANA_CACHE_MAX_BYTES, config.FURIGANA_CACHE_TTL)
+
+
+def speech_cache():
+    return named_cache("speech", config.SPEECH_CACHE_MAX_BYTES, config.SPEECH_CACHE_TTL)
+
+
+def speech_request_cache():
+    # /audio isteği gelene kadar seslendirilecek metinleri tutar
+    return named_cache("speech-requests", 16 * 1024 * 1024, config.DAY)
+
+
+def cache_stats() -> dict:
+    """AI sonuç önbelleklerinin (tüm worker'lar için ortak) istatistikleri."""
+    return {
+        "ocr": ocr_cache().stats(),
+        "furigana": furigana_cache().stats(),
+        "speech": speech_cache().stats(),
+        "in_flight": in_flight.stats(),
+    }
+
+
+# TTS parçaları için paylaşılan havuz (tüm istekler için üst sınır)
+_tts_executor = ThreadPoolExecutor(
+    max_workers=max(1, config.TTS_CHUNK_CONCURRENCY) * 2,
+    thread_name_prefix="tts-chunk"
+)
+
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？!?\n])")
+
+
+def split_speech_text(text: str, max_chars: int, first_chars: int = 200) -> list:
+    """Metni cümle sonlarından (。！？) bölüp en fazla ``max_chars`` uzunlukta parçalara topla.
+
+    İlk parça daha kısa tutulur ki çalma hemen başlasın.
+    """
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if not sentence.strip():
+            continue
+        while len(sentence) > max_chars:
+            # Tek bir cümle bile sınırı aşıyorsa zorla böl
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        limit = max_chars if chunks else min(first_chars, max_chars)
+        if current and len(current) + len(sentence) > limit:
+            chunks.append(current)
+            current = ""
+        current += sentence
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def normalize_text(text: str) -> str:
+    """Önbellek anahtarı için metni normalleştir (NFC, satır sonları, kenar boşlukları)."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def _load_env_files():
+    """Bilinen .env yollarını süreç başına bir kez dene."""
+    global _env_files_loaded
+    if _env_files_loaded:
+        return
+    _env_files_loaded = True
+    env_paths = [
+        Path.cwd() / ".env",
+        Path(__file__).resolve().parent / ".env",
+        Path(__file__).resolve().parent.parent.parent / ".env"
+    ]
+    for path in env_paths:
+        if path.exists():
+            load_dotenv(path)
+            if os.getenv("OPENAI_API_KEY"):
+                break
 
-        # B) Eğer sistemde yoksa ve .env dosyası da yüklenemediyse manuel yol dene
-        if not self.api_key:
-            env_paths = [
-                Path.cwd() / ".env",
-                Path(__file__).resolve().parent / ".env",
-                Path(__file__).resolve().parent.parent.parent / ".env"
-            ]
-            for path in env_paths:
-                if path.exists():
-                    load_dotenv(path)
-                    self.api_key = os.getenv("OPENAI_API_KEY")
-                    if self.api_key: break
-
-        # C) Eğer hala yoksa ve masaüstü modundaysak QSettings'e bak
-        if not self.api_key and QT_AVAILABLE:
-            try:
-                settings = QSettings("FuriJapan", "APIConfig")
-                self.api_key = settings.value("openai_api_key")
-            except:
-                pass
+
+def resolve_api_key() -> Optional[str]:
+    # API anahtarını hiyerarşik olarak ara:
+    # A) Sistem Değişkeni (Render Dashboard / GitHub Secrets)
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    # B) Eğer sistemde yoksa ve .env dosyası da yüklenemediyse manuel yol dene
+    if not api_key:
+        _load_env_files()
+        api_key = os.getenv("OPENAI_API_KEY")
+
+    # C) Eğer hala yoksa ve masaüstü modundaysak QSettings'e bak
+    if not api_key and QT_AVAILABLE:
+        try:
+            settings = QSettings("FuriJapan", "APIConfig")
+            api_key = settings.value("openai_api_key")
+        except:
+            pass
+
+    return api_key
+
+
+class AIClient:
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or resolve_api_key()
 
         # Hiçbir yerde bulunamadıysa hata fırlat
         if not self.api_key:
@@ -51,84 +174,396 @@ class AIClient:
                 "2. Proje ana dizinine .env dosyası koyun."
             )
 
-        self.client = OpenAI(api_key=self.api_key)
+        # Bağlantılar açık tutulur (keep-alive); her çağrıda yeni TLS el sıkışması olmaz
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=config.AI_MAX_CONCURRENCY,
+                max_keepalive_connections=config.AI_MAX_CONCURRENCY
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+        # Tekrar denemeler ratelimit.call_with_retry ile yapılır (Retry-After'a uyar)
+        self.client = OpenAI(api_key=self.api_key, http_client=self.http_client, max_retries=0)
         self.model_name = "gpt-4o"
+        self.ocr_cache = ocr_cache()
+        self.furigana_cache = furigana_cache()
+        self.speech_cache = speech_cache()
+
+    def _chat_create(self, method: str, image_tokens: int = 0, **kwargs):
+        """Sohbet isteğini model hız sınırlayıcısından geçirerek gönder.
+
+        ``method`` metrik etiketidir (örn. "ocr_vision"); süre, sonuç ve
+        token kullanımı bu adla kaydedilir. ``image_tokens`` görüntü başına
+        tahmini maliyettir (bilinmiyorsa tam sayfa varsayılır).
+        """
+        tokens = kwargs.get("max_tokens") or 0
+        for message in kwargs.get("messages", []):
+            content = message["content"]
+            if isinstance(content, str):
+                tokens += estimate_tokens(content)
+                continue
+            for part in content:
+                if part["type"] == "text":
+                    tokens += estimate_tokens(part["text"])
+                else:
+                    tokens += image_tokens or vision_tokens(0, 0)
+        # Akışta eşzamanlılık yuvası akış okunurken de tutulur
+        call = stream_with_retry if kwargs.get("stream") else call_with_retry
+        with track_ai(method):
+            response = call(kwargs["model"], tokens, self.client.chat.completions.create, **kwargs)
+        if not kwargs.get("stream"):
+            observe_usage(method, getattr(response, "usage", None))
+        return response
 
     # ---------------- OCR ----------------
+    def ocr_key(self, image_bytes: bytes, temperature: float = 0.1) -> str:
+        return make_key(
+            "ocr", hashlib.sha256(image_bytes).hexdigest(),
+            self.model_name, float(temperature), OCR_PROMPT_VERSION, *settings_key()
+        )
+
     def ocr_vision(self, image_bytes: bytes, temperature: float = 0.1) -> str:
-        base64_image = base64.b64encode(image_bytes).decode('utf-8')
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": "Resimdeki Japonca metni çıkar. Sadece metni ver."},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
-                        ],
-                    }
+        # Aynı sayfa daha önce okunduysa diskteki sonucu döndür
+        cache_key = self.ocr_key(image_bytes, temperature)
+        with phase("cache"):
+            cached = self.ocr_cache.get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+        return in_flight.do(cache_key, self._ocr_uncached, image_bytes, temperature, cache_key)
+
+    def _ocr_uncached(self, image_bytes: bytes, temperature: float, cache_key: str) -> str:
+        # Lider olmadan hemen önce başka bir çağrı bitirmiş olabilir
+        cached = self.ocr_cache.get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+        # Gri ton, boyut sınırı ve WebP/JPEG ile yüklenen veriyi küçült
+        with phase("preprocess"):
+            payload, mime = prepare_ocr_image(image_bytes)
+        OCR_IMAGE_BYTES.labels("source").inc(len(image_bytes))
+        OCR_IMAGE_BYTES.labels("upstream").inc(len(payload))
+        with phase("base64"):
+            base64_image = base64.b64encode(payload).decode('utf-8')
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": OCR_PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{base64_image}"}},
                 ],
-                max_tokens=2000,
-                temperature=temperature
+            }
+        ]
+        # Hız sınırı payı görüntü boyutuna göre: küçük bölge kırpıntıları
+        # tam sayfa kadar token ayırmaz. Çıktı sınırı da karo başına ölçeklenir.
+        image_tokens = vision_tokens(*image_size(payload))
+        tiles = max(1, (image_tokens - 85) // 170)
+        max_tokens = min(OCR_MAX_TOKENS, max(400, tiles * 400))
+        try:
+            response = self._chat_create(
+                "ocr_vision", image_tokens,
+                model=self.model_name, messages=messages,
+                max_tokens=max_tokens, temperature=temperature
             )
-            return response.choices[0].message.content
+            if response.choices[0].finish_reason == "length" and max_tokens < OCR_MAX_TOKENS:
+                # Kırpıntı beklenenden yoğunmuş: tam sınırla yeniden oku
+                response = self._chat_create(
+                    "ocr_vision", image_tokens,
+                    model=self.model_name, messages=messages,
+                    max_tokens=OCR_MAX_TOKENS, temperature=temperature
+                )
+            text = response.choices[0].message.content
         except Exception as e:
+            # Hatalar önbelleğe yazılmaz
             return f"AI OCR Hatası: {str(e)}"
 
+        if text:
+            self.ocr_cache.set(cache_key, text.encode("utf-8"))
+        return text
+
     # ---------------- FURIGANA ----------------
-    def get_ruby_html_text(self, text: str, mode: str = "normal") -> str:
-        if mode == "plus":
-            instruction = (
-                "KURAL 1: Metindeki her kanji kelimesini tara. Eğer bir kanji kelimesi daha önce geçtiyse, "
-                "onu düz metin olarak bırak. SADECE ilk geçtiği yerde <ruby> içine al.\n"
-                "KURAL 2: Tekrarlanan kanjilere furigana ekleme."
-            )
-        else:
-            instruction = "KURAL: Tüm kanjilere <ruby> etiketi ile Furigana ekle."
+    def furigana_key(self, text: str) -> str:
+        # Sadece normal çıktı saklanır; Plus modu ondan türetilir
+        text = normalize_text(text)
+        return make_key(
+            "furigana", hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "normal", self.model_name, FURIGANA_PROMPT_VERSION
+        )
 
-        prompt = (
+    @staticmethod
+    def _ruby_prompt(text: str) -> str:
+        return (
             "GÖREV: Japonca metni HTML <ruby> formatına dönüştür.\n"
             "Yanıt SADECE HTML olsun.\n"
-            f"{instruction}\n"
+            "KURAL: Tüm kanjilere <ruby> etiketi ile Furigana ekle.\n"
             f"METİN: {text}"
         )
 
+    @staticmethod
+    def clean_ruby_html(raw: str) -> str:
+        # Markdown bloklarını temizle
+        return raw.replace("```html", "").replace("```", "").strip()
+
+    @classmethod
+    def clean_plus_html(cls, raw: str) -> str:
+        """Ham normal çıktıyı Plus moduna çevir (tekrarlanan kelimelerde furigana yok)."""
+        return first_occurrence_only(cls.clean_ruby_html(raw))
+
+    def get_kanji_readings(self, text: str, words: list) -> dict:
+        """Sözlüğün çözemediği kelimelerin bağlama göre hiragana okunuşlarını sor."""
+        prompt = (
+            "GÖREV: Aşağıdaki Japonca metinde geçen kelimelerin bu bağlamdaki okunuşlarını ver.\n"
+            "Yanıt SADECE JSON nesnesi olsun: {\"kelime\": \"hiragana okunuş\"}.\n"
+            f"KELİMELER: {json.dumps(words, ensure_ascii=False)}\n"
+            f"METİN: {text}"
+        )
+        response = self._chat_create(
+            "get_kanji_readings",
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            max_tokens=1000,
+            temperature=0.0
+        )
+        readings = json.loads(response.choices[0].message.content)
+        return {w: r for w, r in readings.items() if isinstance(r, str) and r}
+
+    def _local_ruby_html(self, text: str) -> Optional[str]:
+        """Sözlükle furigana üret; yapılamazsa None (tüm metin LLM'e gider)."""
+        if not config.LOCAL_FURIGANA:
+            return None
         try:
-            response = self.client.chat.completions.create(
+            # Sözlük yüklenemezse (örn. paketlenmiş masaüstü sürümünde .tsv yoksa) LLM'e düş
+            return get_engine().to_ruby_html(text, resolve=self.get_kanji_readings)
+        except Exception as e:
+            logger.warning(f"Yerel furigana kullanılamadı, model kullanılacak: {e}")
+            return None
+
+    def get_ruby_html_text(self, text: str, mode: str = "normal") -> str:
+        """Metni <ruby> HTML'ine çevir.
+
+        Plus modu ayrı bir model çağrısı değildir: normal çıktı (önbellekte
+        varsa oradan) yerel olarak süzülür.
+        """
+        if mode == "plus":
+            return first_occurrence_only(self.get_ruby_html_text(text, mode="normal"))
+
+        text = normalize_text(text)
+        cache_key = self.furigana_key(text)
+        with phase("cache"):
+            cached = self.furigana_cache.get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+        return in_flight.do(cache_key, self._ruby_html_uncached, text, cache_key)
+
+    def _ruby_html_uncached(self, text: str, cache_key: str) -> str:
+        cached = self.furigana_cache.get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+        with phase("dictionary"):
+            local_html = self._local_ruby_html(text)
+        if local_html:
+            self.furigana_cache.set(cache_key, local_html.encode("utf-8"))
+            return local_html
+
+        try:
+            response = self._chat_create(
+                "get_ruby_html_text",
                 model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
+                messages=[{"role": "user", "content": self._ruby_prompt(text)}],
                 max_tokens=3500,
                 temperature=0.0
             )
             raw = response.choices[0].message.content
-            # Markdown bloklarını temizle
-            clean_html = raw.replace("```html", "").replace("```", "").strip()
-            return clean_html
         except Exception as e:
             return f"Furigana HTML Hatası: {str(e)}"
 
+        clean_html = self.clean_ruby_html(raw)
+        if clean_html:
+            self.furigana_cache.set(cache_key, clean_html.encode("utf-8"))
+        return clean_html
+
+    def stream_ruby_html_text(self, text: str) -> Iterator[str]:
+        """get_ruby_html_text'in akış sürümü: model ürettikçe parçaları ver.
+
+        Parçalar ham model çıktısıdır (Markdown işaretleri dahil olabilir);
+        akış bitince temizlenmiş HTML önbelleğe yazılır. Plus modu için
+        birleşik çıktı ``clean_plus_html`` ile süzülür.
+        """
+        text = normalize_text(text)
+        cache_key = self.furigana_key(text)
+        cached = self.furigana_cache.get(cache_key)
+        if cached is not None:
+            yield cached.decode("utf-8")
+            return
+
+        local_html = self._local_ruby_html(text)
+        if local_html:
+            self.furigana_cache.set(cache_key, local_html.encode("utf-8"))
+            yield local_html
+            return
+
+        parts = []
+        deltas = self._stream_chat(
+            "stream_ruby_html_text", self._ruby_prompt(text), max_tokens=3500, temperature=0.0
+        )
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+
+        clean_html = self.clean_ruby_html("".join(parts))
+        if clean_html:
+            self.furigana_cache.set(cache_key, clean_html.encode("utf-8"))
+
+    def _stream_chat(self, method: str, prompt: str, **kwargs) -> Iterator[str]:
+        stream = self._chat_create(
+            method,
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            # Son parça token kullanımını taşır (choices boş gelir)
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    observe_usage(method, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # İstemci bağlantıyı keserse yukarıdaki isteği de kapat
+            stream.close()
+
     # ---------------- TTS (SES) ----------------
-    def generate_speech(self, text: str, voice: str = "nova") -> bytes:
+    def speech_key(self, text: str, voice: str = "nova") -> str:
+        text = normalize_text(text)
+        return make_key("tts", hashlib.sha256(text.encode("utf-8")).hexdigest(), voice, TTS_MODEL)
+
+    def _synthesize_speech(self, text: str, voice: str) -> bytes:
         try:
-            response = self.client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                input=text[:4000]
-            )
-            return response.content
+            # Gövde de yuva içinde okunur; eşzamanlılık sınırı indirmeyi kapsar
+            with track_ai("generate_speech"):
+                return call_with_retry(
+                    TTS_MODEL, 0, lambda: self.client.audio.speech.create(
+                        model=TTS_MODEL,
+                        voice=voice,
+                        input=text
+                    ).content
+                )
         except Exception as e:
             raise Exception(f"AI Ses Hatası: {str(e)}")
 
+    def iter_speech_chunks(self, text: str, voice: str = "nova") -> Iterator[bytes]:
+        """Metni cümle sınırlarından parçalara bölüp paralel seslendir, MP3 parçalarını sırayla ver.
+
+        Aynı anda en fazla TTS_CHUNK_CONCURRENCY parça üretilir; ilk parça
+        hazır olunca çalmaya başlanabilir. Tüm ses, önbelleğe yazılır.
+        """
+        chunks = split_speech_text(normalize_text(text), config.TTS_CHUNK_CHARS)
+        window = max(1, config.TTS_CHUNK_CONCURRENCY)
+        futures = deque()
+        parts = []
+        next_index = 0
+        try:
+            while next_index < len(chunks) or futures:
+                while next_index < len(chunks) and len(futures) < window:
+                    futures.append(_tts_executor.submit(self._synthesize_speech, chunks[next_index], voice))
+                    next_index += 1
+                audio = futures.popleft().result()
+                parts.append(audio)
+                yield audio
+        finally:
+            for future in futures:
+                future.cancel()
+
+        if parts:
+            self.speech_cache.set(self.speech_key(text, voice), b"".join(parts))
+
+    def _produce_speech(self, text: str, voice: str) -> bytes:
+        cached = self.speech_cache.get(self.speech_key(text, voice))
+        if cached is not None:
+            return cached
+        return b"".join(self.iter_speech_chunks(text, voice))
+
+    def generate_speech(self, text: str, voice: str = "nova") -> bytes:
+        key = self.speech_key(text, voice)
+        cached = self.speech_cache.get(key)
+        if cached is not None:
+            return cached
+        return in_flight.do(key, self._produce_speech, text, voice)
+
+    def generate_speech_file(self, text: str, voice: str = "nova") -> Tuple[str, Path]:
+        """Sesi üret (veya önbellekten bul) ve önbellekteki MP3 dosyasının yolunu döndür."""
+        key = self.speech_key(text, voice)
+        with phase("cache"):
+            path = self.speech_cache.get_path(key)
+        if path is None:
+            in_flight.do(key, self._produce_speech, text, voice)
+            path = self.speech_cache.get_path(key)
+            if path is None:
+                raise Exception("AI Ses Hatası: ses dosyası önbelleğe yazılamadı")
+        return key, path
+
+    def prepare_speech(self, text: str, voice: str = "nova") -> str:
+        """Sesi hemen üretmeden bir kimlik ver; ses /audio/{kimlik}.mp3 istenince akıtılır.
+
+        Metin ortak diskte saklanır, bu yüzden isteği hangi worker alırsa alsın
+        sesi üretebilir.
+        """
+        key = self.speech_key(text, voice)
+        if self.speech_cache.get_path(key) is None:
+            request = {"text": normalize_text(text), "voice": voice}
+            speech_request_cache().set(key, json.dumps(request, ensure_ascii=False).encode("utf-8"))
+        return key
+
+    def stream_prepared_speech(self, key: str) -> Optional[Iterator[bytes]]:
+        """prepare_speech ile kaydedilen metnin sesini parça parça üret."""
+        data = speech_request_cache().get(key)
+        if data is None:
+            return None
+        request = json.loads(data.decode("utf-8"))
+        return self.iter_speech_chunks(request["text"], request["voice"])
+
     # ---------------- CHAT / ASİSTAN ----------------
+    @staticmethod
+    def _assistant_prompt(context, question) -> str:
+        return f"BAĞLAM:\n{context}\n\nSORU: {question}"
+
     def get_assistant_response(self, context, question):
-        prompt = f"BAĞLAM:\n{context}\n\nSORU: {question}"
+        prompt = self._assistant_prompt(context, question)
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_create(
+                "get_assistant_response",
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=2000,
             )
             return response.choices[0].message.content
         except Exception as e:
-            return f"Asistan Hatası: {str(e)}"
\ No newline at end of file
+            return f"Asistan Hatası: {str(e)}"
+
+    def stream_assistant_response(self, context, question) -> Iterator[str]:
+        """get_assistant_response'un akış sürümü."""
+        yield from self._stream_chat(
+            "stream_assistant_response", self._assistant_prompt(context, question), max_tokens=2000
+        )
+
+
+# ---------------- PAYLAŞILAN İSTEMCİ ----------------
+_shared_lock = threading.Lock()
+_shared_client: Optional[AIClient] = None
+
+
+def get_shared_client() -> AIClient:
+    """Süreç genelinde tek AIClient döndür.
+
+    Sunucu ve masaüstü uygulaması aynı istemciyi (ve bağlantı havuzunu)
+    kullanır. API anahtarı değişirse istemci yeni anahtarla yeniden kurulur.
+    """
+    global _shared_client
+    api_key = resolve_api_key()
+    with _shared_lock:
+        if _shared_client is None or _shared_client.api_key != api_key:
+            # Eski istemci o an kullanımda olabilir; kapatmadan bırakılır
+            _shared_client = AIClient(api_key=api_key)
+        return _shared_client
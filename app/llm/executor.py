@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config
+from app.cache.singleflight import SingleFlight
+
+# Senkron OpenAI çağrıları bu sınırlı havuzda çalışır; event loop bloklanmaz.
+# Her worker aynı anda en fazla AI_MAX_CONCURRENCY isteği yukarıda tutar.
+_executor = ThreadPoolExecutor(
+    max_workers=config.AI_MAX_CONCURRENCY,
+    thread_name_prefix="ai-call"
+)
+
+
+async def run_ai(func, *args, **kwargs):
+    """Bloklayan bir AIClient metodunu AI thread havuzunda çalıştır."""
+    loop = asyncio.get_running_loop()
+    # İstek bağlamı (aşama süreleri) thread'e taşınır
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+async def run_ai_shared(flight: SingleFlight, key: str, func, *args, **kwargs):
+    """``run_ai`` gibi; ``flight``'ta ``key`` ile süren çağrı varsa onu bekler.
+
+    ``flight`` ve ``key`` çağrılan metodun kendi içinde kullandıklarıyla aynı
+    olmalıdır (örn. ``client.in_flight`` ve ``AIClient.ocr_key``); böylece
+    GUI'den, ön yüklemeden ve HTTP'den gelen çağrılar tek kayıtta birleşir.
+    Takipçiler AI havuzunda thread tutmadan, event loop'ta liderin sonucunu bekler.
+    """
+    return await flight.do_async(key, lambda: run_ai(func, *args, **kwargs))
+
+
+async def iterate_ai(func, *args, **kwargs):
+    """Bloklayan bir üreteci (örn. token akışı) AI havuzunda adım adım tüket."""
+    iterator = await run_ai(lambda: iter(func(*args, **kwargs)))
+    done = object()
+    try:
+        while True:
+            item = await run_ai(next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                await run_ai(close)
+            except Exception:
+                pass  # Üreteç o an başka bir thread'de çalışıyor olabilir
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,250 @@
+import os
+import math
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import openai
+
+from app import config
+
+logger = logging.getLogger("furijapan")
+
+
+class SharedTokenBucket:
+    """Dakikada ``rate`` birimlik kova; boşsa yeterince dolana kadar bekletir.
+
+    Kova SQLite'ta tutulur ve tüm worker'lar arasında ortaktır. Hesap limiti worker'lara sabit paylarla bölünmez; boşta duran worker'ın
+    payını yoğun olan kullanır. Kova durumu ``BEGIN IMMEDIATE`` ile
+    güncellenir, beklerken kilit tutulmaz.
+    """
+
+    def __init__(self, db_path, name: str, rate_per_minute: int):
+        self.db_path = str(db_path)
+        self.name = name
+        self.capacity = float(max(1, rate_per_minute))
+        self.rate = self.capacity / 60.0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Bağlantı thread ve süreç başına açılır (gunicorn fork sonrası yeniden)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # Kova durumu kaybolsa da zararsız
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, amount: float) -> float:
+        """Yeterince jeton varsa al ve 0, yoksa beklenecek süreyi döndür."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens = self.capacity if row is None else min(
+                self.capacity, row[0] + max(0.0, now - row[1]) * self.rate
+            )
+            wait = 0.0
+            if tokens >= amount:
+                tokens -= amount
+            else:
+                wait = (amount - tokens) / self.rate
+            conn.execute(
+                "INSERT INTO buckets(name, tokens, updated) VALUES(?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (self.name, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, amount: float = 1.0):
+        amount = min(float(amount), self.capacity)
+        while True:
+            try:
+                wait = self._take(amount)
+            except sqlite3.Error as e:
+                # Ortak kova okunamazsa sınırlamadan devam et; 429 gelirse tekrar denenir
+                logger.warning(f"Hız sınırı kovası okunamadı ({self.name}): {e}")
+                return
+            if wait <= 0:
+                return
+            # Diğer worker'larla aynı anda uyanmamak için biraz jitter
+            time.sleep(wait + random.uniform(0, 0.05))
+
+
+class ModelLimiter:
+    """Bir model için istek/dakika, token/dakika ve eşzamanlı istek sınırı.
+
+    RPM/TPM kovaları hesap geneli olduğu için ``db_path``'teki SQLite'ta
+    tutulur ve tüm worker'larda ortaktır; eşzamanlılık sınırı worker başınadır.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_in_flight: int, db_path, name: str):
+        self.requests = SharedTokenBucket(db_path, f"{name}:requests", rpm)
+        self.tokens = SharedTokenBucket(db_path, f"{name}:tokens", tpm) if tpm > 0 else None
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+
+    def acquire(self, tokens: int = 0):
+        """Eşzamanlılık yuvası al ve kovalardan düş; iş bitince ``release`` çağrılmalı."""
+        self._slots.acquire()
+        try:
+            self.requests.acquire()
+            if self.tokens is not None and tokens:
+                self.tokens.acquire(tokens)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self):
+        self._slots.release()
+
+
+class HeldStream:
+    """Akış yanıtını sarar; eşzamanlılık yuvası akış tükenene veya kapanana kadar tutulur."""
+
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(model: str) -> ModelLimiter:
+    """Model başına süreç genelinde tek sınırlayıcı."""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            if model.startswith("tts"):
+                limiter = ModelLimiter(
+                    config.TTS_RPM, 0, config.AI_MAX_IN_FLIGHT, config.RATE_LIMIT_DB_PATH, model
+                )
+            else:
+                limiter = ModelLimiter(
+                    config.AI_RPM, config.AI_TPM, config.AI_MAX_IN_FLIGHT, config.RATE_LIMIT_DB_PATH, model
+                )
+            _limiters[model] = limiter
+        return limiter
+
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """TPM hesabı için kaba tahmin: Japoncada karakter başına ~1 token + çıktı sınırı."""
+    return len(text) + max_tokens
+
+
+def vision_tokens(width: int, height: int) -> int:
+    """Yüksek ayrıntılı görüntünün token maliyeti (OpenAI'nin karo hesabı).
+
+    Görüntü 2048x2048'e sığdırılır, kısa kenarı 768'e indirilir; her 512'lik
+    karo 170, taban 85 token tutar.
+    """
+    if width <= 0 or height <= 0:
+        return 1105
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, openai.RateLimitError):
+        # Kota bittiyse beklemek işe yaramaz
+        return getattr(e, "code", None) != "insufficient_quota"
+    return isinstance(e, (openai.APIConnectionError, openai.InternalServerError))
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP tarih biçimi: üstel bekleme kullanılır
+    return None
+
+
+def call_with_retry(_model: str, _tokens: int, _func: Callable, *args, **kwargs):
+    """``_func``'ı model sınırlayıcısı içinde çağır; 429/5xx/bağlantı hatalarında tekrar dene.
+
+    Bekleme süresi sunucunun Retry-After başlığından, yoksa jitter'lı üstel
+    geri çekilmeden (0..taban*2^deneme, en fazla AI_RETRY_MAX_DELAY) gelir.
+    Beklerken eşzamanlılık yuvası tutulmaz. Baştaki parametreler alt çizgilidir;
+    çağrılan fonksiyona ``model=`` gibi aynı adlı argümanlar geçilebilir.
+    """
+    return _retrying(_model, _tokens, lambda: _func(*args, **kwargs), hold=False)
+
+
+def stream_with_retry(_model: str, _tokens: int, _func: Callable, *args, **kwargs) -> HeldStream:
+    """Akış döndüren çağrılar (``stream=True``) için ``call_with_retry``.
+
+    Yuva akış tüketilene veya kapatılana kadar bırakılmaz, böylece
+    AI_MAX_IN_FLIGHT açık akışları da sınırlar. Tekrar deneme yalnızca akış
+    açılırken yapılır.
+    """
+    return _retrying(_model, _tokens, lambda: _func(*args, **kwargs), hold=True)
+
+
+def _retrying(model: str, tokens: int, call: Callable, hold: bool):
+    limiter = limiter_for(model)
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            result = call()
+        except Exception as e:
+            limiter.release()
+            if attempt >= config.AI_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(config.AI_RETRY_MAX_DELAY, 0.5 * 2 ** attempt))
+            delay = min(delay, config.AI_RETRY_MAX_DELAY)
+            attempt += 1
+            logger.warning(
+                f"{model} isteği başarısız ({type(e).__name__}), "
+                f"{delay:.1f} sn sonra tekrar denenecek ({attempt}/{config.AI_MAX_RETRIES})"
+            )
+            time.sleep(delay)
+            continue
+        if hold:
+            return HeldStream(result, limiter.release)
+        limiter.release()
+        return result
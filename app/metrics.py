@@ -0,0 +1,138 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from app.timing import phase
+
+# prometheus_client opsiyonel (masaüstü uygulaması onsuz çalışır).
+# gunicorn altında PROMETHEUS_MULTIPROC_DIR ayarlıysa (gunicorn.conf.py) her
+# worker değerlerini o klasöre yazar, /metrics hepsini toplar.
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, multiprocess
+    )
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NoopMetric:
+    """prometheus_client yokken kullanılan, hiçbir şey yapmayan metrik."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+
+def _metric(cls_name: str, *args, **kwargs):
+    if not METRICS_AVAILABLE:
+        return _NoopMetric()
+    cls = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}[cls_name]
+    if cls_name == "gauge":
+        # Worker'ların anlık değerleri toplanır; ölen worker'ınki düşülür
+        kwargs.setdefault("multiprocess_mode", "livesum")
+    return cls(*args, **kwargs)
+
+
+# Saniye cinsinden; model çağrıları onlarca saniye sürebilir
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# --------- HTTP ---------
+HTTP_REQUESTS = _metric(
+    "counter", "furijapan_http_requests_total", "HTTP istekleri",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = _metric(
+    "histogram", "furijapan_http_request_duration_seconds", "HTTP istek süresi",
+    ["method", "route"], buckets=_LATENCY_BUCKETS
+)
+HTTP_IN_PROGRESS = _metric(
+    "gauge", "furijapan_http_requests_in_progress", "Süren HTTP istekleri", ["method"]
+)
+
+# --------- OPENAI ---------
+AI_LATENCY = _metric(
+    "histogram", "furijapan_ai_request_duration_seconds",
+    "OpenAI çağrı süresi (akışlarda ilk yanıta kadar)", ["method"], buckets=_LATENCY_BUCKETS
+)
+AI_REQUESTS = _metric(
+    "counter", "furijapan_ai_requests_total", "OpenAI çağrıları", ["method", "outcome"]
+)
+AI_TOKENS = _metric(
+    "counter", "furijapan_ai_tokens_total", "OpenAI token kullanımı", ["method", "kind"]
+)
+AI_IN_FLIGHT = _metric(
+    "gauge", "furijapan_ai_requests_in_flight", "Süren OpenAI çağrıları", ["method"]
+)
+OCR_IMAGE_BYTES = _metric(
+    "counter", "furijapan_ocr_image_bytes_total",
+    "OCR görüntü baytları (source: ön işleme öncesi, upstream: gönderilen)", ["kind"]
+)
+
+# --------- RENDER ---------
+RENDER_SECONDS = _metric(
+    "histogram", "furijapan_render_duration_seconds",
+    "Sayfa rasterize/kodlama süresi", ["stage"], buckets=_LATENCY_BUCKETS
+)
+
+# --------- ÖNBELLEKLER ---------
+CACHE_REQUESTS = _metric(
+    "counter", "furijapan_cache_requests_total", "Önbellek okumaları",
+    ["cache", "tier", "result"]
+)
+
+
+@contextmanager
+def track_ai(method: str):
+    """Bir OpenAI çağrısının süresini, sonucunu ve eşzamanlı sayısını kaydet.
+
+    Süre ayrıca isteğin ``upstream`` aşamasına (Server-Timing) eklenir.
+    """
+    AI_IN_FLIGHT.labels(method).inc()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with phase("upstream"):
+            yield
+        outcome = "ok"
+    finally:
+        AI_LATENCY.labels(method).observe(time.perf_counter() - start)
+        AI_REQUESTS.labels(method, outcome).inc()
+        AI_IN_FLIGHT.labels(method).dec()
+
+
+def observe_usage(method: str, usage):
+    """OpenAI yanıtındaki ``usage`` bilgisini token sayaçlarına ekle."""
+    if usage is None:
+        return
+    AI_TOKENS.labels(method, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    AI_TOKENS.labels(method, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Prometheus metin çıktısı ve içerik tipi (tüm worker'lar toplanmış)."""
+    if not METRICS_AVAILABLE:
+        return b"# prometheus_client kurulu degil\n", CONTENT_TYPE_LATEST
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,84 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+logger = logging.getLogger("furijapan")
+
+
+class RequestTimings:
+    """Bir isteğin aşama süreleri (Server-Timing başlığı ve yavaş istek kaydı için).
+
+    Aynı aşama birden çok kez ölçülürse (örn. paralel bölge OCR'ı) süreler
+    toplanır ve sayısı tutulur; bu yüzden aşamaların toplamı duvar saati
+    süresini aşabilir.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._phases: Dict[str, list] = {}
+        self._lock = threading.Lock()  # Aşamalar thread havuzlarından da yazılır
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def phases(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {"ms": round(seconds * 1000, 1), "count": count}
+                for name, (seconds, count) in self._phases.items()
+            }
+
+    def header(self) -> str:
+        """``Server-Timing`` başlık değeri (süreler milisaniye)."""
+        parts = []
+        for name, phase in self.phases().items():
+            desc = f';desc="x{phase["count"]}"' if phase["count"] > 1 else ""
+            parts.append(f"{name}{desc};dur={phase['ms']}")
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Thread havuzuna giden çağrılar bağlamı kopyalar; nesne paylaşıldığı için
+# oradaki ölçümler de aynı isteğe yazılır.
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def begin() -> RequestTimings:
+    """Geçerli bağlamda (HTTP isteği) yeni ölçüm başlat."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def phase(name: str):
+    """Bloğun süresini geçerli isteğin ``name`` aşamasına ekle (istek dışında etkisiz)."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def log_slow_request(timings: RequestTimings, threshold_ms: int, **fields):
+    """İstek eşikten uzun sürdüyse aşamalarıyla birlikte tek satır JSON yaz."""
+    duration_ms = timings.elapsed() * 1000
+    if threshold_ms <= 0 or duration_ms < threshold_ms:
+        return
+    record = {"event": "slow_request", **fields, "duration_ms": round(duration_ms, 1),
+              "phases": timings.phases()}
+    logger.warning(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+
+# render.yaml: gunicorn -c gunicorn.conf.py server:app
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Prometheus çok süreçli mod: her worker metriklerini bu klasöre yazar,
+# /metrics hangi worker'a düşerse düşsün hepsinin toplamını döndürür.
+# Worker'lar fork edilmeden önce (bu dosya yüklenirken) ayarlanmalı.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "furijapan-metrics")
+)
+
+
+def on_starting(server):
+    # Önceki çalıştırmadan kalan değerler sayaçları şişirmesin
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
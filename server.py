@@ -6,14 +6,14 @@ BASE_DIR = Path(__file__).resolve().parent
 if str(BASE_DIR) not in sys.path:
     sys.path.append(str(BASE_DIR))
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
-import io
-import fitz  # PyMuPDF
-import base64
-from PIL import Image
-import tempfile
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, FileResponse, Response
+from fastapi.concurrency import run_in_threadpool
 import os
+import time
+import asyncio
+import base64
+from contextlib import asynccontextmanager
 import logging
 from typing import Optional
 
@@ -26,12 +26,36 @@ logger = logging.getLogger("furijapan")
 
 # --------- AI CLIENT IMPORT (MOCK YOK) ---------
 try:
-    from app.llm.client import AIClient
+    from app.llm.client import get_shared_client, cache_stats, in_flight, speech_cache
     logger.info("AIClient başarıyla yüklendi.")
 except ImportError as e:
     logger.critical("AIClient import edilemedi! OCR ve AI çalışmayacak.")
     raise e  # ÇÖKMEK İYİDİR → gizli mock istemiyoruz
 
+from app import config
+from app import metrics
+from app import timing
+from app.cache.singleflight import StreamFlight
+from app.docs.registry import DocumentRegistry
+from app.docs.store import DocumentStore, probe_image, probe_pdf
+from app.docs.upload import (
+    UploadError, UploadLimitMiddleware, receive_upload, upload_error_response
+)
+from app.docs.render import (
+    get_page_png, get_page_image, page_cache_key, page_cache,
+    IMAGE_FORMATS, WEB_IMAGE_TYPES, VIEW_ZOOM, OCR_ZOOM
+)
+from app.docs.prefetch import Prefetcher
+from app.docs.batch import ocr_pages, encode_event
+from app.docs.textlayer import document_page_text, document_page_blocks
+from app.docs.regions import crop_text_regions
+from app.docs.preprocess import preprocess_stats
+from app.furigana.plus import first_occurrence_only
+from app.jobs.store import JobStore
+from app.jobs.runner import JobRunner
+from app.llm import executor
+from app.llm.executor import run_ai, run_ai_shared, iterate_ai
+
 # --------- FASTAPI ---------
 app = FastAPI()
 
@@ -44,51 +68,110 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": f"Sunucu hatası: {str(exc)}"}
     )
 
-# --------- APP STATE ---------
-state = {
-    "current_pdf": None,
-    "current_image": None,
-    "is_pdf": False,
-    "total_pages": 0,
-    "temp_file_path": None,
-    "current_filename": None
-}
+# --------- METRİKLER ---------
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Rota başına istek sayısı ve süresi (akışlarda başlıklar gidene kadar)"""
+    metrics.HTTP_IN_PROGRESS.labels(request.method).inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Rota şablonu (/documents/{doc_id}/...) kullanılır; kimlikler etiket olmaz
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - start)
+        metrics.HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
+        metrics.HTTP_IN_PROGRESS.labels(request.method).dec()
+
+
+@app.middleware("http")
+async def record_server_timing(request: Request, call_next):
+    """Aşama sürelerini Server-Timing başlığına ekle, yavaş istekleri JSON olarak logla.
+
+    Akış yanıtlarında yalnızca başlıklar gönderilene kadarki aşamalar görünür.
+    """
+    if not config.SERVER_TIMING and config.SLOW_REQUEST_MS <= 0:
+        return await call_next(request)
+    timings = timing.begin()
+    response = await call_next(request)
+    if config.SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.header()
+    timing.log_slow_request(
+        timings, config.SLOW_REQUEST_MS,
+        method=request.method,
+        path=request.url.path,
+        route=getattr(request.scope.get("route"), "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus metin formatında metrikler (tüm gunicorn worker'ları toplanmış)"""
+    data, content_type = metrics.render_latest()
+    return Response(content=data, media_type=content_type)
+
+# --------- BELGE KAYDI ---------
+# Yüklemeler SHA-256 özetiyle ortak diske yazılır; belge kimliği bu özettir.
+# Her worker kendi açık belgelerini LRU kayıtta tutar, olmayanı depodan açar.
+store = DocumentStore(config.DOCUMENT_STORE_DIR)
+registry = DocumentRegistry(
+    max_docs=config.DOC_REGISTRY_MAX_DOCS,
+    max_bytes=config.DOC_REGISTRY_MAX_BYTES,
+    loader=store.open
+)
 
+# Görüntülenen sayfanın komşuları arka planda hazırlanır; belge çıkınca iptal edilir
+prefetcher = Prefetcher(max_workers=config.PREFETCH_WORKERS, depth=config.PREFETCH_DEPTH)
+registry.add_evict_listener(prefetcher.cancel)
+
+
+def prefetch_ocr(doc, page_num: int):
+    """Komşu sayfanın OCR sonucunu /ocr-page'in kullanacağı anahtarlarla önbelleğe hazırla"""
+    text, images = page_ocr_inputs(doc, page_num)
+    if text is None:
+        ai = get_shared_client()
+        for image in images:
+            ai.ocr_vision(image)
+
+
+def schedule_prefetch(doc, page_num: int, render_task):
+    prefetcher.schedule(doc, page_num, render_task)
+    if config.PREFETCH_OCR:
+        prefetcher.schedule(doc, page_num, prefetch_ocr, kind="ocr")
+
+
+@asynccontextmanager
+async def leased_document(doc_id: Optional[str]):
+    """Belgeyi blok boyunca kirala (gerekirse depodan açar; yoksa None)
+
+    Kirada olan belge LRU ile kayıttan çıksa da blok bitene kadar kapanmaz.
+    """
+    doc = await run_in_threadpool(registry.acquire, doc_id)
+    try:
+        yield doc
+    finally:
+        if doc is not None:
+            doc.release()
 
-def cleanup_temp_files():
-    """Geçici dosyaları temizle"""
-    if state["temp_file_path"] and os.path.exists(state["temp_file_path"]):
-        try:
-            os.unlink(state["temp_file_path"])
-        except Exception as e:
-            logger.error(f"Temp file cleanup error: {e}")
-        state["temp_file_path"] = None
-    
-    # Eski PDF'i kapat
-    if state["current_pdf"]:
-        try:
-            state["current_pdf"].close()
-        except:
-            pass
-        state["current_pdf"] = None
 
 @app.on_event("startup")
 async def startup_event():
-    """Uygulama başlarken state'i temizle"""
-    cleanup_temp_files()
-    state.update({
-        "current_pdf": None,
-        "current_image": None,
-        "is_pdf": False,
-        "total_pages": 0,
-        "temp_file_path": None,
-        "current_filename": None
-    })
+    job_runner.start()
+
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     """Uygulama kapanırken temizlik yap"""
-    cleanup_temp_files()
+    # Yarım kalan iş diğer worker'lar için kuyruğa geri döner
+    await job_runner.stop()
+    executor.shutdown()
+    prefetcher.shutdown()
+    registry.close_all()
 
 @app.get("/", response_class=HTMLResponse)
 def home():
@@ -317,6 +400,9 @@ def home():
         <button onclick="addFuriganaPlus()" style="background:#8e44ad;">
             <i class="fas fa-plus-circle"></i> Furigana Plus
         </button>
+        <button onclick="ocrAllPages()" style="background:#16a085;">
+            <i class="fas fa-book"></i> Tüm Sayfalar
+        </button>
     </div>
 
     <textarea id="source" placeholder="OCR Metni buraya gelecek..." rows="6"></textarea>
@@ -367,6 +453,7 @@ def home():
 let totalPages = 0;
 let currentPage = 0;
 let currentFileName = "";
+let currentDocId = ""; // Sunucudaki belge kimliği
 let isPasteMode = false;
 let audioCache = null; // Ses önbelleği
 let currentAudioText = ""; // Şu anki sesin metni
@@ -397,6 +484,7 @@ if (!document.querySelector('link[href*="font-awesome"]')) {
         .fa-language:before { content: "あ"; }
         .fa-chevron-left:before { content: "←"; }
         .fa-chevron-right:before { content: "→"; }
+        .fa-book:before { content: "📚"; }
     `;
     document.head.appendChild(style);
 }
@@ -602,6 +690,7 @@ async function uploadFile(file, isPasted = false) {
         document.getElementById("downloadFuriganaBtn").style.display = "none";
         totalPages = 0;
         currentPage = 0;
+        currentDocId = "";
         
         // Ses önbelleğini temizle
         audioCache = null;
@@ -651,6 +740,7 @@ async function uploadFile(file, isPasted = false) {
         if(data.pages) {
             totalPages = data.pages;
             currentPage = 0;
+            currentDocId = data.doc_id;
             currentIsPdf = data.is_pdf; // PDF mi değil mi bilgisini kaydet
             
             // PDF ise navigasyonu göster, değilse (resimse) gizle
@@ -683,6 +773,12 @@ async function uploadDoc(){
     await uploadFile(fileInput.files[0], false);
 }
 
+// Sayfa görüntüsü URL'si (tarayıcı ETag/Cache-Control ile önbelleğe alır)
+function pageImageUrl(pageNum) {
+    const maxWidth = Math.min(2000, Math.ceil(document.getElementById("pdfArea").clientWidth * (window.devicePixelRatio || 1)));
+    return `/documents/${encodeURIComponent(currentDocId)}/pages/${pageNum}?format=webp&quality=80&max_width=${maxWidth}`;
+}
+
 async function updatePage(){
     if (totalPages === 0) {
         setStatus("Gösterilecek sayfa yok");
@@ -691,45 +787,17 @@ async function updatePage(){
     
     try {
         setStatus("Sayfa getiriliyor...");
-        // Cache buster
-        const v = new Date().getTime(); 
-        let res = await fetch(`/page/${currentPage}?v=${v}`);
+        const imgElement = document.getElementById("pageImg");
         
-        // Yanıtı text olarak al
-        const responseText = await res.text();
-        
-        if(!res.ok) {
-            // HTML hatası mı kontrol et
-            if(responseText.trim().startsWith("<!DOCTYPE") || responseText.trim().startsWith("<html")) {
-                showError("Sayfa yükleme hatası: HTML yanıt alındı.");
-                throw new Error("HTML hatası alındı");
-            }
-            
-            try {
-                const errorData = JSON.parse(responseText);
-                throw new Error(errorData.detail || "Sayfa alınamadı");
-            } catch {
-                throw new Error(responseText || "Sayfa alınamadı");
-            }
-        }
+        await new Promise((resolve, reject) => {
+            imgElement.onload = resolve;
+            imgElement.onerror = () => reject(new Error("Görüntü verisi alınamadı"));
+            imgElement.src = pageImageUrl(currentPage);
+        });
         
-        // Başarılı yanıt
-        let data;
-        try {
-            data = JSON.parse(responseText);
-        } catch {
-            throw new Error("Geçersiz JSON yanıtı");
-        }
-
-        if(data.image) {
-            const imgElement = document.getElementById("pageImg");
-            imgElement.src = "data:image/png;base64," + data.image;
-            imgElement.style.display = "block";
-            document.getElementById("pageInfo").innerText = (currentPage + 1) + " / " + totalPages;
-            setStatus("Hazır");
-        } else {
-            throw new Error("Görüntü verisi alınamadı");
-        }
+        imgElement.style.display = "block";
+        document.getElementById("pageInfo").innerText = (currentPage + 1) + " / " + totalPages;
+        setStatus("Hazır");
     } catch(e) {
         console.error("Sayfa güncelleme hatası:", e);
         setStatus("Sayfa yüklenemedi");
@@ -762,6 +830,7 @@ async function ocrPage(){
         setStatus("OCR yapılıyor...");
         let form = new FormData();
         form.append("page_num", currentPage.toString());
+        form.append("doc_id", currentDocId);
         let res = await fetch("/ocr-page", {method:"POST", body:form});
         
         // Yanıtı text olarak al
@@ -807,97 +876,165 @@ async function ocrPage(){
     }
 }
 
-// Furigana ekleme fonksiyonu - <ruby> tag'i kullanarak
-async function addFurigana() {
-    const sourceText = document.getElementById("source").value;
-    if(!sourceText.trim()) {
-        setStatus("Furigana eklemek için metin yok!");
-        showError("Furigana eklemek için metin yok!");
+// Tüm belgeyi OCR'la; sonuçlar NDJSON olarak geldikçe metin kutusuna yazılır
+async function ocrAllPages(){
+    if(totalPages === 0 || !currentDocId) {
+        setStatus("Önce bir dosya yükleyin!");
         return;
     }
-
+    
+    const pageTexts = {};
+    const sourceBox = document.getElementById("source");
+    
+    function renderPages() {
+        sourceBox.value = Object.keys(pageTexts)
+            .map(Number)
+            .sort((a, b) => a - b)
+            .map(p => `--- Sayfa ${p + 1} ---\n${pageTexts[p]}`)
+            .join("\n\n");
+    }
+    
     try {
         showLoader(true);
-        setStatus("Furigana ekleniyor...");
-
+        setStatus(`Toplu OCR başlatıldı (0 / ${totalPages})`);
         let form = new FormData();
-        form.append("text", sourceText);
-
-        let res = await fetch("/furigana", {method:"POST", body:form});
-
-        const responseText = await res.text();
-
-        if(!res.ok) {
-            try {
-                const errorData = JSON.parse(responseText);
-                throw new Error(errorData.detail || "Furigana ekleme başarısız");
-            } catch {
-                throw new Error(responseText || "Furigana ekleme başarısız");
+        form.append("concurrency", "4");
+        let res = await fetch(`/documents/${encodeURIComponent(currentDocId)}/ocr`, {method:"POST", body:form});
+        
+        if(!res.ok || !res.body) {
+            throw new Error("Toplu OCR başlatılamadı");
+        }
+        
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        
+        while(true) {
+            const {value, done} = await reader.read();
+            if(done) break;
+            buffer += decoder.decode(value, {stream: true});
+            
+            let newline;
+            while((newline = buffer.indexOf("\n")) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if(!line) continue;
+                
+                const event = JSON.parse(line);
+                if(event.event === "page") {
+                    pageTexts[event.page] = event.error ? `[Hata: ${event.error}]` : event.text;
+                    renderPages();
+                    setStatus(`Toplu OCR: ${event.completed} / ${event.total}`);
+                }
             }
         }
-
-        let data = JSON.parse(responseText);
-
-        furiganaResult = data.html || "Furigana eklenemedi";
-
-        const furiganaElement = document.getElementById("furiganaText");
-        furiganaElement.innerHTML = furiganaResult;
-        furiganaElement.style.display = "block";
-
-        document.getElementById("downloadFuriganaBtn").style.display = "block";
-
-        setStatus("Furigana eklendi.");
-        showSuccess("Furigana başarıyla eklendi!");
-
+        
+        setStatus("Toplu OCR tamamlandı.");
+        showSuccess("Tüm sayfalar okundu!");
+        document.getElementById("furiganaText").style.display = "none";
+        document.getElementById("downloadFuriganaBtn").style.display = "none";
     } catch(e) {
-        console.error("Furigana ekleme hatası:", e);
-        setStatus("Furigana hatası: " + e.message);
-        showError("Furigana hatası: " + e.message);
-    } finally { 
-        showLoader(false); 
+        console.error("Toplu OCR hatası:", e);
+        setStatus("Toplu OCR hatası: " + e.message);
+        showError("Toplu OCR hatası: " + e.message);
+    } finally {
+        showLoader(false);
+    }
+}
+
+// Server-Sent Events akışını oku; her token parçası için onDelta(birikenMetin) çağrılır
+async function streamSSE(url, form, onDelta) {
+    let res = await fetch(url, {method:"POST", body:form});
+    if(!res.ok || !res.body) {
+        const responseText = await res.text();
+        try {
+            const errorData = JSON.parse(responseText);
+            throw new Error(errorData.detail || "İstek başarısız");
+        } catch(e) {
+            throw new Error(e.message || responseText || "İstek başarısız");
+        }
+    }
+    
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+    
+    while(true) {
+        const {value, done} = await reader.read();
+        if(done) break;
+        buffer += decoder.decode(value, {stream: true});
+        
+        let boundary;
+        while((boundary = buffer.indexOf("\n\n")) >= 0) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            if(!message.startsWith("data: ")) continue;
+            
+            const event = JSON.parse(message.slice(6));
+            if(event.error) throw new Error(event.error);
+            if(event.done) return event.text;
+            text += event.delta;
+            onDelta(text);
+        }
     }
+    return text;
 }
-async function addFuriganaPlus() {
+
+// Akış sırasında Markdown işaretlerini gizle
+function stripCodeFences(raw) {
+    return raw.replace(/```html/g, "").replace(/```/g, "").trim();
+}
+
+// Furigana ekleme (normal veya Plus) - <ruby> tag'i kullanarak, akışla
+async function runFurigana(url, label) {
     const sourceText = document.getElementById("source").value;
     if(!sourceText.trim()) {
-        setStatus("Furigana Plus için metin yok!");
-        showError("Furigana Plus için metin yok!");
+        setStatus(`${label} için metin yok!`);
+        showError(`${label} için metin yok!`);
         return;
     }
 
+    const furiganaElement = document.getElementById("furiganaText");
     try {
         showLoader(true);
-        setStatus("Furigana Plus ekleniyor...");
+        setStatus(`${label} ekleniyor...`);
 
         let form = new FormData();
         form.append("text", sourceText);
 
-        let res = await fetch("/furigana-plus", {method:"POST", body:form});
-        const responseText = await res.text();
-
-        if(!res.ok) {
-            throw new Error("Furigana Plus başarısız");
-        }
+        furiganaElement.innerHTML = "";
+        furiganaElement.style.display = "block";
 
-        let data = JSON.parse(responseText);
-        furiganaResult = data.html || "Furigana Plus eklenemedi";
+        const html = await streamSSE(url, form, (partial) => {
+            furiganaElement.innerHTML = stripCodeFences(partial);
+            showLoader(false);
+        });
 
-        const furiganaElement = document.getElementById("furiganaText");
+        furiganaResult = html || `${label} eklenemedi`;
         furiganaElement.innerHTML = furiganaResult;
-        furiganaElement.style.display = "block";
 
         document.getElementById("downloadFuriganaBtn").style.display = "block";
 
-        setStatus("Furigana Plus tamamlandı.");
-        showSuccess("Furigana Plus başarıyla eklendi!");
+        setStatus(`${label} eklendi.`);
+        showSuccess(`${label} başarıyla eklendi!`);
 
     } catch(e) {
-        console.error(e);
-        showError("Furigana Plus hatası: " + e.message);
-    } finally {
-        showLoader(false);
+        console.error(`${label} hatası:`, e);
+        setStatus(`${label} hatası: ` + e.message);
+        showError(`${label} hatası: ` + e.message);
+    } finally { 
+        showLoader(false); 
     }
 }
+
+function addFurigana() {
+    return runFurigana("/furigana/stream", "Furigana");
+}
+
+function addFuriganaPlus() {
+    return runFurigana("/furigana-plus/stream", "Furigana Plus");
+}
   
 async function askAI(){
     const question = document.getElementById("question").value;
@@ -915,40 +1052,20 @@ async function askAI(){
         return;
     }
     
+    const answerBox = document.getElementById("answer");
     try {
         showLoader(true);
         let form = new FormData();
         form.append("context", source);
         form.append("question", question);
-        let res = await fetch("/ask", {method:"POST", body:form});
-        
-        // Yanıtı text olarak al
-        const responseText = await res.text();
-        
-        if(!res.ok) {
-            // HTML hatası mı kontrol et
-            if(responseText.trim().startsWith("<!DOCTYPE") || responseText.trim().startsWith("<html")) {
-                showError("AI hatası: HTML yanıt alındı.");
-                throw new Error("HTML hatası alındı");
-            }
-            
-            try {
-                const errorData = JSON.parse(responseText);
-                throw new Error(errorData.detail || "AI sorgulama başarısız");
-            } catch {
-                throw new Error(responseText || "AI sorgulama başarısız");
-            }
-        }
         
-        // Başarılı yanıt
-        let data;
-        try {
-            data = JSON.parse(responseText);
-        } catch {
-            throw new Error("Geçersiz JSON yanıtı");
-        }
+        answerBox.value = "";
+        const answer = await streamSSE("/ask/stream", form, (partial) => {
+            answerBox.value = partial;
+            showLoader(false);
+        });
         
-        document.getElementById("answer").value = data.answer || "Yanıt alınamadı";
+        answerBox.value = answer || "Yanıt alınamadı";
         setStatus("AI yanıtı alındı.");
         showSuccess("AI yanıtı başarıyla alındı!");
     } catch(e) {
@@ -1049,32 +1166,37 @@ async function playSpeech() {
         
         let form = new FormData();
         form.append("text", text);
+        form.append("as_url", "true");
         let res = await fetch("/speech", {method:"POST", body:form});
         
+        const responseText = await res.text();
         if(!res.ok) {
-            const errorText = await res.text();
-            if(errorText.trim().startsWith("<!DOCTYPE") || errorText.trim().startsWith("<html")) {
+            if(responseText.trim().startsWith("<!DOCTYPE") || responseText.trim().startsWith("<html")) {
                 showError("Ses hatası: HTML yanıt alındı.");
                 throw new Error("HTML hatası alındı");
             }
             throw new Error("Ses oluşturma başarısız");
         }
         
-        let blob = await res.blob();
-        if(blob.type && blob.type.startsWith('audio/')) {
-            // Ses önbelleğe al
-            const audioUrl = URL.createObjectURL(blob);
-            audioCache = audioUrl;
-            currentAudioText = text;
-            
-            audioPlayer.src = audioUrl;
-            audioPlayer.play();
-            document.getElementById('progressBar').style.display = 'block';
-            document.getElementById('audioStatus').innerText = "Oynatılıyor...";
-            showSuccess("Ses oluşturuldu ve oynatılıyor!");
-        } else {
+        let data;
+        try {
+            data = JSON.parse(responseText);
+        } catch {
+            throw new Error("Geçersiz JSON yanıtı");
+        }
+        if(!data.url) {
             throw new Error("Geçersiz ses formatı");
         }
+        
+        // Sunucudaki ses adresini önbelleğe al (tarayıcı Range ile ileri/geri sarar)
+        audioCache = data.url;
+        currentAudioText = text;
+        
+        audioPlayer.src = data.url;
+        audioPlayer.play();
+        document.getElementById('progressBar').style.display = 'block';
+        document.getElementById('audioStatus').innerText = "Oynatılıyor...";
+        showSuccess("Ses oluşturuldu ve oynatılıyor!");
     } catch(e) {
         console.error("Ses oynatma hatası:", e);
         setStatus("Ses hatası: " + e.message);
@@ -1189,8 +1311,7 @@ document.addEventListener('keyup', function(e) {
 @app.post("/furigana-plus")
 async def furigana_plus(text: str = Form(...)):
     try:
-        ai = AIClient()
-        html = ai.get_ruby_html_text(text, mode="plus")
+        html = await shared_ruby_html(text, mode="plus")
         return {"html": html}
     except Exception as e:
         logger.error(f"Furigana Plus hatası: {e}", exc_info=True)
@@ -1199,19 +1320,61 @@ async def furigana_plus(text: str = Form(...)):
             content={"detail": f"Furigana Plus hatası: {str(e)}"}
         )
 
-@app.post("/upload-doc")
-async def upload_doc(file: UploadFile = File(...)):
-    """PDF veya resim dosyasını yükle"""
-    global state
-    
-    # Önceki dosyaları temizle
-    cleanup_temp_files()
+def sse_token_response(gen_func, *args, finalize=lambda text: text, **kwargs):
+    """Token üretecini Server-Sent Events olarak akıt: delta'lar, sonunda tam metin"""
+    async def events():
+        parts = []
+        try:
+            async for delta in iterate_ai(gen_func, *args, **kwargs):
+                parts.append(delta)
+                yield encode_event({"delta": delta}, "sse")
+        except Exception as e:
+            logger.error(f"Akış hatası: {e}", exc_info=True)
+            yield encode_event({"error": str(e)}, "sse")
+            return
+        yield encode_event({"done": True, "text": finalize("".join(parts))}, "sse")
     
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/furigana/stream")
+async def furigana_stream(text: str = Form(...)):
+    ai = get_shared_client()
+    return sse_token_response(ai.stream_ruby_html_text, text, finalize=ai.clean_ruby_html)
+
+@app.post("/furigana-plus/stream")
+async def furigana_plus_stream(text: str = Form(...)):
+    ai = get_shared_client()
+    # Normal furigana akıtılır; Plus süzgeci yerel olarak son metne uygulanır
+    return sse_token_response(ai.stream_ruby_html_text, text, finalize=ai.clean_plus_html)
+
+@app.post("/ask/stream")
+async def ask_stream(context: str = Form(...), question: str = Form(...)):
+    ai = get_shared_client()
+    return sse_token_response(ai.stream_assistant_response, context, question)
+
+# Sınırı aşan yükleme gövdesi okunurken kesilir (Content-Length olmasa da)
+app.add_middleware(UploadLimitMiddleware, path="/upload-doc", max_bytes=config.UPLOAD_MAX_BYTES)
+
+
+@app.post("/upload-doc")
+async def upload_doc(request: Request):
+    """PDF veya resim dosyasını yükle (multipart "file" alanı)"""
     try:
-        # Dosya içeriğini oku
-        data = await file.read()
+        # Multipart gövdesi ayrıştırılırken dosya doğrudan depo diskine akar
+        try:
+            with timing.phase("receive"):
+                received = await receive_upload(request, store)
+        except UploadError as e:
+            return upload_error_response(e)
+        tmp_path, doc_id, size, head = received.tmp_path, received.digest, received.size, received.head
+        filename = received.filename
         
-        if len(data) == 0:
+        if size == 0:
+            tmp_path.unlink(missing_ok=True)
             return JSONResponse(
                 status_code=400,
                 content={"detail": "Boş dosya yüklendi"}
@@ -1221,85 +1384,61 @@ async def upload_doc(file: UploadFile = File(...)):
         is_pdf = False
         
         # 1. İlk bytes'ı kontrol et
-        if len(data) >= 4 and data[:4] == b"%PDF":
+        if head[:4] == b"%PDF":
             is_pdf = True
         else:
             # 2. Uzantıya bak
-            filename = file.filename or ""
+            filename = filename or ""
             if filename.lower().endswith('.pdf'):
                 is_pdf = True
         
-        if is_pdf:
-            # PDF dosyası - geçici dosyaya yaz
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    tmp.write(data)
-                    tmp_path = tmp.name
-                
-                # PyMuPDF ile aç
-                doc = fitz.open(tmp_path)
-                state.update({
-                    "current_pdf": doc,
-                    "current_image": None,
-                    "is_pdf": True,
-                    "total_pages": doc.page_count,
-                    "temp_file_path": tmp_path,
-                    "current_filename": file.filename
-                })
-                
-                logger.info(f"PDF yüklendi: {file.filename}, Sayfa sayısı: {doc.page_count}")
-                
-                return {
-                    "pages": doc.page_count,
-                    "is_pdf": True,
-                    "filename": file.filename
-                }
-                
-            except Exception as e:
-                logger.error(f"PDF açma hatası: {e}")
-                if 'tmp_path' in locals() and tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": f"PDF açılamadı: {str(e)}"}
-                )
-        
+        # Aynı içerik daha önce yüklendiyse diske tekrar yazmadan aç
+        if store.contains(doc_id):
+            tmp_path.unlink(missing_ok=True)
         else:
-            # Resim dosyası
+            # Depoya yalnızca açılabilen dosyalar girer; resimde sadece başlık
+            # okunur (çözülmez, yeniden kodlanmaz), PDF'te xref tablosu
             try:
-                # PIL ile resmi açmayı dene
-                img = Image.open(io.BytesIO(data))
-                img.verify()  # Resmin doğruluğunu kontrol et
-                
-                # Resmi PNG formatına çevir
-                img = Image.open(io.BytesIO(data))
-                img_bytes = io.BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes = img_bytes.getvalue()
-                
-                state.update({
-                    "current_pdf": None,
-                    "current_image": img_bytes,
-                    "is_pdf": False,
-                    "total_pages": 1,
-                    "temp_file_path": None,
-                    "current_filename": file.filename
-                })
-                
-                logger.info(f"Resim yüklendi: {file.filename}, Boyut: {img.size}")
-                
-                return {
-                    "pages": 1,
-                    "is_pdf": False,
-                    "filename": file.filename
-                }
-                
+                with timing.phase("probe"):
+                    await run_in_threadpool(probe_pdf if is_pdf else probe_image, tmp_path)
             except Exception as e:
-                logger.error(f"Resim açma hatası: {e}")
+                tmp_path.unlink(missing_ok=True)
+                kind = "PDF" if is_pdf else "Resim"
+                logger.error(f"{kind} açma hatası: {e}")
                 return JSONResponse(
                     status_code=400,
-                    content={"detail": f"Resim açılamadı: {str(e)}"}
+                    content={"detail": f"{kind} açılamadı: {str(e)}"}
                 )
+            with timing.phase("store"):
+                await run_in_threadpool(store.put_file, tmp_path, doc_id, filename, is_pdf, size)
+        
+        try:
+            with timing.phase("open"):
+                async with leased_document(doc_id) as doc:
+                    if doc is None:
+                        raise ValueError("belge depoda bulunamadı")
+                    is_pdf, total_pages = doc.is_pdf, doc.total_pages
+        except Exception as e:
+            kind = "PDF" if is_pdf else "Resim"
+            logger.error(f"{kind} açma hatası: {e}")
+            # Açılamayan dosya depoda kalırsa bu kimlikle her istek 500 verir
+            await run_in_threadpool(store.remove, doc_id)
+            return JSONResponse(
+                status_code=400,
+                content={"detail": f"{kind} açılamadı: {str(e)}"}
+            )
+        
+        logger.info(
+            f"{'PDF' if is_pdf else 'Resim'} yüklendi: {filename}, "
+            f"Sayfa sayısı: {total_pages}, id: {doc_id}"
+        )
+        
+        return {
+            "doc_id": doc_id,
+            "pages": total_pages,
+            "is_pdf": is_pdf,
+            "filename": filename
+        }
         
     except Exception as e:
         logger.error(f"Yükleme hatası: {e}", exc_info=True)
@@ -1308,97 +1447,344 @@ async def upload_doc(file: UploadFile = File(...)):
             content={"detail": f"Dosya yükleme hatası: {str(e)}"}
         )
 
+def page_image_response(data: bytes, mime: str) -> JSONResponse:
+    """Eski /page yanıtı: base64 ve JSON kodlama süreleri ayrı ölçülür"""
+    with timing.phase("base64"):
+        image = base64.b64encode(data).decode()
+    with timing.phase("json"):
+        return JSONResponse(content={"image": image, "mime": mime})
+
 @app.get("/page/{num}")
-async def get_page(num: int):
+async def get_page(num: int, doc_id: Optional[str] = None):
     """Belirtilen sayfayı görüntü olarak döndür"""
     try:
-        if state["is_pdf"] and state["current_pdf"]:
-            if num < 0 or num >= state["total_pages"]:
+        async with leased_document(doc_id) as doc:
+            if doc is None:
                 return JSONResponse(
                     status_code=404,
-                    content={"detail": "Sayfa aralık dışında"}
+                    content={"detail": "Yüklü dosya bulunamadı"}
                 )
+        
+            if doc.is_pdf:
+                if num < 0 or num >= doc.total_pages:
+                    return JSONResponse(
+                        status_code=404,
+                        content={"detail": "Sayfa aralık dışında"}
+                    )
             
-            try:
-                page = state["current_pdf"].load_page(num)
-                # DPI değerini artırarak daha kaliteli görüntü
-                pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-                img_bytes = pix.tobytes("png")
+                try:
+                    # DPI değerini artırarak daha kaliteli görüntü
+                    with timing.phase("render"):
+                        img_bytes = await run_in_threadpool(get_page_png, doc, num, VIEW_ZOOM)
+                    schedule_prefetch(doc, num, lambda d, p: get_page_png(d, p, VIEW_ZOOM))
                 
-                return {"image": base64.b64encode(img_bytes).decode()}
-            except Exception as e:
-                logger.error(f"PDF sayfası işleme hatası: {e}")
+                    return page_image_response(img_bytes, "image/png")
+                except Exception as e:
+                    logger.error(f"PDF sayfası işleme hatası: {e}")
+                    return JSONResponse(
+                        status_code=500,
+                        content={"detail": f"PDF sayfası işlenemedi: {str(e)}"}
+                    )
+        
+            # Resim dosyası - tarayıcının gösterebildiği biçimse doğrudan döndür
+            if doc.mime in WEB_IMAGE_TYPES:
+                return page_image_response(doc.image, doc.mime)
+            with timing.phase("render"):
+                img_bytes = await run_in_threadpool(get_page_image, doc, 0, "png", 90)
+            return page_image_response(img_bytes, "image/png")
+            
+    except Exception as e:
+        logger.error(f"Sayfa alma hatası: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Sayfa alınamadı: {str(e)}"}
+        )
+
+@app.get("/documents/{doc_id}/pages/{num}")
+async def get_page_image_binary(
+    doc_id: str,
+    num: int,
+    request: Request,
+    format: str = "webp",
+    quality: int = 80,
+    max_width: Optional[int] = None
+):
+    """Sayfayı ham görüntü olarak döndür (base64/JSON yok, tarayıcı önbelleğe alır)"""
+    fmt = format.lower().replace("jpg", "jpeg")
+    if fmt not in IMAGE_FORMATS:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Desteklenmeyen format: {format}"}
+        )
+    quality = max(1, min(100, quality))
+    if max_width is not None:
+        max_width = max(64, min(8000, max_width))
+    
+    # Belge kimliği içerik özeti olduğu için aynı URL her zaman aynı görüntüdür
+    etag = f'"{page_cache_key(doc_id, num, VIEW_ZOOM, fmt, quality, max_width)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        async with leased_document(doc_id) as doc:
+            if doc is None:
                 return JSONResponse(
-                    status_code=500,
-                    content={"detail": f"PDF sayfası işlenemedi: {str(e)}"}
+                    status_code=404,
+                    content={"detail": "Yüklü dosya bulunamadı"}
+                )
+            if num < 0 or num >= doc.total_pages:
+                return JSONResponse(
+                    status_code=404,
+                    content={"detail": "Sayfa aralık dışında"}
                 )
         
-        elif state["current_image"]:
-            # Resim dosyası - doğrudan döndür
-            return {"image": base64.b64encode(state["current_image"]).decode()}
-        
-        else:
-            return JSONResponse(
-                status_code=404,
-                content={"detail": "Yüklü dosya bulunamadı"}
+            img_bytes = await run_in_threadpool(get_page_image, doc, num, fmt, quality, max_width)
+            schedule_prefetch(
+                doc, num,
+                lambda d, p: get_page_image(d, p, fmt, quality, max_width)
             )
-            
+            return Response(content=img_bytes, media_type=IMAGE_FORMATS[fmt], headers=headers)
     except Exception as e:
-        logger.error(f"Sayfa alma hatası: {e}", exc_info=True)
+        logger.error(f"Sayfa görüntüsü hatası: {e}", exc_info=True)
         return JSONResponse(
             status_code=500,
             content={"detail": f"Sayfa alınamadı: {str(e)}"}
         )
 
+def page_ocr_inputs(doc, page_num: int):
+    """OCR'a gidecek girdiler: (metin katmanı, None) veya (None, görüntü listesi)
+
+    Bloklayan çağrı; /ocr-page, toplu OCR ve ön yükleme aynı yolu kullanır,
+    böylece aynı görüntüler (ve OCR önbellek anahtarları) üretilir.
+    """
+    if doc.is_pdf:
+        # Dijital PDF: gömülü metin katmanı iyiyse görsel OCR'a gerek yok
+        with timing.phase("text_layer"):
+            text = document_page_text(doc, page_num)
+        if text is not None:
+            return text, None
+        # OCR için daha yüksek DPI
+        with timing.phase("render"):
+            img_bytes = get_page_png(doc, page_num, OCR_ZOOM)
+        with timing.phase("text_layer"):
+            hint_boxes = document_page_blocks(doc, page_num, OCR_ZOOM)
+    else:
+        img_bytes = doc.image
+        hint_boxes = None
+
+    # Sayfanın çoğu boşluksa sadece metin bölgelerini gönder
+    try:
+        with timing.phase("regions"):
+            crops = crop_text_regions(img_bytes, hint_boxes)
+    except Exception as e:
+        logger.warning(f"Bölge tespiti başarısız, tüm sayfa gönderiliyor: {e}")
+        crops = None
+    return None, crops or [img_bytes]
+
+
+# --------- PAYLAŞILAN AI ÇAĞRILARI ---------
+# Aynı içerik için eşzamanlı istekler (örn. aynı sayfayı açan 30 öğrenci)
+# istemcinin in_flight kaydında, istemcinin kendi anahtarlarıyla tek çağrıda
+# birleşir; bekleyenler AI thread havuzunu meşgul etmez.
+async def shared_ocr(image_bytes: bytes) -> str:
+    ai = get_shared_client()
+    return await run_ai_shared(in_flight, ai.ocr_key(image_bytes), ai.ocr_vision, image_bytes)
+
+
+async def shared_ruby_html(text: str, mode: str = "normal") -> str:
+    # Plus modu normal çıktıdan türetilir; iki mod aynı çağrıyı paylaşır
+    ai = get_shared_client()
+    html = await run_ai_shared(in_flight, ai.furigana_key(text), ai.get_ruby_html_text, text)
+    return first_occurrence_only(html) if mode == "plus" else html
+
+
+async def shared_speech_file(text: str, voice: str = "nova"):
+    ai = get_shared_client()
+    return await run_ai_shared(in_flight, ai.speech_key(text, voice), ai.generate_speech_file, text, voice)
+
+
+def join_ocr_texts(texts) -> str:
+    errors = [t for t in texts if t and t.startswith("AI OCR Hatası")]
+    if errors:
+        return errors[0]
+    if len(texts) == 1:
+        return texts[0]
+    return "\n".join(t.strip() for t in texts if t and t.strip())
+
+
+async def ocr_document_page(doc, page_num: int) -> str:
+    """Belgenin bir sayfasını OCR'la (tek sayfa ve toplu OCR ortak yolu)
+
+    AI hatası metin olarak döndürülmez, ``RuntimeError`` yükselir; toplu
+    OCR o sayfa için ``error`` olayı, /ocr-page hata yanıtı verir.
+    """
+    text, images = await run_in_threadpool(page_ocr_inputs, doc, page_num)
+    if text is not None:
+        return text
+    texts = await asyncio.gather(*(shared_ocr(image) for image in images))
+    text = join_ocr_texts(texts)
+    if text.startswith("AI OCR Hatası"):
+        raise RuntimeError(text)
+    return text
+
+
+# --------- ARKA PLAN İŞLERİ ---------
+# Uzun işler SQLite kuyruğunda durur; hangi worker boştaysa alır, biten
+# sayfalar kaydedilir ve yeniden başlayan iş sadece kalan sayfaları işler.
+JOB_KINDS = ("ocr", "furigana", "speech")
+job_store = JobStore(config.JOBS_DB_PATH)
+
+
+async def ocr_job_item(job: dict, page_num: int) -> dict:
+    async with leased_document(job["doc_id"]) as doc:
+        if doc is None:
+            raise RuntimeError("Yüklü dosya bulunamadı")
+        text = await ocr_document_page(doc, page_num)
+        if not text:
+            raise RuntimeError("Metin okunamadı")
+        return {"text": text}
+
+
+async def furigana_job_item(job: dict, page_num: int) -> dict:
+    result = await ocr_job_item(job, page_num)
+    mode = job["params"].get("mode", "normal")
+    html = await shared_ruby_html(result["text"], mode=mode)
+    if html.startswith("Furigana HTML Hatası"):
+        raise RuntimeError(html)
+    result["html"] = html
+    return result
+
+
+async def speech_job_item(job: dict, page_num: int) -> dict:
+    result = await ocr_job_item(job, page_num)
+    voice = job["params"].get("voice", "nova")
+    key, _ = await shared_speech_file(result["text"], voice)
+    result["audio_url"] = f"/audio/{key}.mp3"
+    return result
+
+
+job_runner = JobRunner(
+    job_store,
+    {"ocr": ocr_job_item, "furigana": furigana_job_item, "speech": speech_job_item},
+    concurrency=config.JOB_CONCURRENCY,
+    stale_after=config.JOB_STALE_SECONDS
+)
+
+
+@app.post("/jobs")
+async def create_job(
+    doc_id: str = Form(...),
+    kind: str = Form("ocr"),
+    start: int = Form(0),
+    end: Optional[int] = Form(None),
+    mode: str = Form("normal"),
+    voice: str = Form("nova")
+):
+    """Belgenin [start, end) sayfaları için arka plan işi başlat"""
+    if kind not in JOB_KINDS:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Geçersiz iş türü (desteklenenler: {', '.join(JOB_KINDS)})"}
+        )
+    async with leased_document(doc_id) as doc:
+        if doc is None:
+            return JSONResponse(
+                status_code=404,
+                content={"detail": "Yüklü dosya bulunamadı"}
+            )
+        total_pages = doc.total_pages
+
+    end = total_pages if end is None else min(end, total_pages)
+    start = max(0, start)
+    if start >= end:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": "Geçersiz sayfa aralığı"}
+        )
+
+    params = {"ocr": {}, "furigana": {"mode": mode}, "speech": {"voice": voice}}[kind]
+    job = await run_in_threadpool(job_store.create, kind, doc_id, range(start, end), params)
+    job_runner.wake()
+    return JSONResponse(status_code=202, content=job)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """İşin durumu ve ilerlemesi"""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "İş bulunamadı"}
+        )
+    return job
+
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """İşin şimdiye kadar biten (veya başarısız olan) sayfaları, sayfa sırasıyla"""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "İş bulunamadı"}
+        )
+    results = await run_in_threadpool(job_store.results, job_id)
+    return {"job_id": job_id, "status": job["status"], "results": results}
+
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Başarısız sayfaları olan işi kuyruğa geri koy (biten sayfalar tekrar işlenmez)"""
+    resumed = await run_in_threadpool(job_store.resume, job_id)
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "İş bulunamadı"}
+        )
+    if not resumed:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": f"İş devam ettirilemez (durum: {job['status']})"}
+        )
+    job_runner.wake()
+    return JSONResponse(status_code=202, content=job)
+
+
 @app.post("/ocr-page")
-async def ocr_page(page_num: int = Form(...)):
+async def ocr_page(page_num: int = Form(...), doc_id: Optional[str] = Form(None)):
     """OCR işlemi yap"""
     try:
-        ai = AIClient()
-        
-        if state["is_pdf"]:
-            if not state["current_pdf"]:
+        async with leased_document(doc_id) as doc:
+            if doc is None:
                 return JSONResponse(
                     status_code=400,
-                    content={"detail": "PDF yüklü değil"}
+                    content={"detail": "Dosya yüklü değil"}
                 )
-            
-            if page_num < 0 or page_num >= state["total_pages"]:
+        
+            if page_num < 0 or page_num >= doc.total_pages:
                 return JSONResponse(
                     status_code=400,
                     content={"detail": "Geçersiz sayfa numarası"}
                 )
-            
-            try:
-                page = state["current_pdf"].load_page(page_num)
-                # OCR için daha yüksek DPI
-                pix = page.get_pixmap(matrix=fitz.Matrix(3.0, 3.0))
-                img_bytes = pix.tobytes("png")
-                text = ai.ocr_vision(img_bytes)
-            except Exception as e:
-                logger.error(f"PDF OCR hatası: {e}")
-                return JSONResponse(
-                    status_code=500,
-                    content={"detail": f"PDF OCR hatası: {str(e)}"}
-                )
         
-        else:
-            if not state["current_image"]:
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": "Resim yüklü değil"}
-                )
-            
+            kind = "PDF" if doc.is_pdf else "Resim"
             try:
-                text = ai.ocr_vision(state["current_image"])
+                text = await ocr_document_page(doc, page_num)
             except Exception as e:
-                logger.error(f"Resim OCR hatası: {e}")
+                logger.error(f"{kind} OCR hatası: {e}")
                 return JSONResponse(
                     status_code=500,
-                    content={"detail": f"Resim OCR hatası: {str(e)}"}
+                    content={"detail": f"{kind} OCR hatası: {str(e)}"}
                 )
         
-        return {"text": text}
+            with timing.phase("json"):
+                return JSONResponse(content={"text": text})
         
     except Exception as e:
         logger.error(f"OCR hatası: {e}", exc_info=True)
@@ -1407,12 +1793,61 @@ async def ocr_page(page_num: int = Form(...)):
             content={"detail": f"OCR hatası: {str(e)}"}
         )
 
+@app.post("/documents/{doc_id}/ocr")
+async def ocr_document(
+    doc_id: str,
+    start: int = Form(0),
+    end: Optional[int] = Form(None),
+    concurrency: int = Form(4),
+    stream_format: str = Form("ndjson")
+):
+    """Belgenin tüm sayfalarını (veya [start, end) aralığını) OCR'la, sonuçları geldikçe akıt"""
+    async with leased_document(doc_id) as doc:
+        if doc is None:
+            return JSONResponse(
+                status_code=404,
+                content={"detail": "Yüklü dosya bulunamadı"}
+            )
+        total_pages = doc.total_pages
+    
+    end = total_pages if end is None else min(end, total_pages)
+    start = max(0, start)
+    if start >= end:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": "Geçersiz sayfa aralığı"}
+        )
+    concurrency = max(1, min(config.BATCH_OCR_MAX_CONCURRENCY, concurrency))
+    stream_format = "sse" if stream_format == "sse" else "ndjson"
+    
+    async def events():
+        total = end - start
+        completed = 0
+        # Akış boyunca belge kirada kalır; arada çıkarılmışsa depodan yeniden açılır
+        async with leased_document(doc_id) as doc:
+            if doc is None:
+                yield encode_event({"event": "error", "detail": "Yüklü dosya bulunamadı"}, stream_format)
+                return
+            yield encode_event({"event": "start", "doc_id": doc_id, "pages": total}, stream_format)
+            async for result in ocr_pages(doc, range(start, end), ocr_document_page, concurrency):
+                completed += 1
+                result.update({"event": "page", "completed": completed, "total": total})
+                yield encode_event(result, stream_format)
+        yield encode_event({"event": "done", "completed": completed, "total": total}, stream_format)
+    
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/ask")
 async def ask(context: str = Form(...), question: str = Form(...)):
     """AI'ye soru sor"""
     try:
-        ai = AIClient()
-        answer = ai.get_assistant_response(context, question)
+        ai = get_shared_client()
+        answer = await run_ai(ai.get_assistant_response, context, question)
         return {"answer": answer}
     except Exception as e:
         logger.error(f"AI sorgulama hatası: {e}", exc_info=True)
@@ -1421,8 +1856,21 @@ async def ask(context: str = Form(...), question: str = Form(...)):
             content={"detail": f"AI sorgulama hatası: {str(e)}"}
         )
 
+def audio_file_response(key: str, path, request: Request):
+    """Önbellekteki MP3'ü ETag ve Range desteğiyle döndür"""
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Content-Disposition": "inline; filename=speech.mp3"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    # FileResponse "Range" isteklerine 206 ile yanıt verir (ileri/geri sarma)
+    return FileResponse(path, media_type="audio/mpeg", headers=headers)
+
 @app.post("/speech")
-async def speech(text: str = Form(...)):
+async def speech(request: Request, text: str = Form(...), as_url: bool = Form(False)):
     """Metni sese çevir"""
     try:
         if not text.strip():
@@ -1431,13 +1879,13 @@ async def speech(text: str = Form(...)):
                 content={"detail": "Boş metin"}
             )
         
-        ai = AIClient()
-        audio = ai.generate_speech(text)
-        return StreamingResponse(
-            io.BytesIO(audio), 
-            media_type="audio/mpeg",
-            headers={"Content-Disposition": "inline; filename=speech.mp3"}
-        )
+        ai = get_shared_client()
+        if as_url:
+            # Oynatıcı sesi GET ile alır: hazırsa dosyadan (Range), değilse üretilirken akıtılır
+            key = await run_ai(ai.prepare_speech, text)
+            return {"url": f"/audio/{key}.mp3"}
+        key, path = await shared_speech_file(text)
+        return audio_file_response(key, path, request)
     except Exception as e:
         logger.error(f"Ses oluşturma hatası: {e}", exc_info=True)
         return JSONResponse(
@@ -1445,22 +1893,48 @@ async def speech(text: str = Form(...)):
             content={"detail": f"Ses oluşturma hatası: {str(e)}"}
         )
 
+speech_streams = StreamFlight()
+
+
+@app.get("/audio/{audio_id}.mp3")
+async def get_audio(audio_id: str, request: Request):
+    """Önceden üretilmiş sesi döndür"""
+    path = await run_in_threadpool(speech_cache().get_path, audio_id)
+    if path is not None:
+        return audio_file_response(audio_id, path, request)
+    
+    # Henüz üretilmemiş: parçalar paralel seslendirilip sırayla tek MP3 olarak akıtılır
+    ai = get_shared_client()
+    chunks = await run_ai(ai.stream_prepared_speech, audio_id)
+    if chunks is None:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Ses bulunamadı"}
+        )
+    # Aynı sesi isteyenler (aralık yoklaması + tekrar istek, birden çok sekme)
+    # tek seslendirmeyi paylaşır; bu isteğin üreteci ancak lider olursa çalışır
+    return StreamingResponse(
+        speech_streams.subscribe(audio_id, lambda: iterate_ai(lambda: chunks)),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-store", "Content-Disposition": "inline; filename=speech.mp3"}
+    )
+
 @app.get("/health")
 async def health_check():
     """Sağlık kontrol endpoint'i"""
-    return {"status": "ok", "state": {
-        "has_pdf": state["current_pdf"] is not None,
-        "has_image": state["current_image"] is not None,
-        "is_pdf": state["is_pdf"],
-        "total_pages": state["total_pages"],
-        "filename": state["current_filename"]
-    }}
+    return {
+        "status": "ok",
+        "documents": registry.stats(),
+        "caches": await run_in_threadpool(cache_stats),
+        "page_cache": await run_in_threadpool(page_cache.stats),
+        "ocr_preprocess": preprocess_stats(),
+        "speech_streams": speech_streams.stats()
+    }
 
 @app.post("/furigana")
 async def furigana(text: str = Form(...)):
     try:
-        ai = AIClient()
-        html = ai.get_ruby_html_text(text)
+        html = await shared_ruby_html(text)
         return {"html": html}
     except Exception as e:
         logger.error(f"Furigana hatası: {e}", exc_info=True)
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+pytest.importorskip("dotenv")
+pytest.importorskip("PIL")
+
+from app import config
+from app.llm import ratelimit
+from app.llm.client import TTS_MODEL, AIClient
+
+
+class FakeEndpoint:
+    """OpenAI uç noktası yerine geçer; aldığı argümanları kaydeder."""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.response
+
+
+@pytest.fixture
+def ai(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_DB_PATH", tmp_path / "ratelimit.sqlite3")
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    chat = FakeEndpoint(SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="テスト"), finish_reason="stop")],
+        usage=None,
+    ))
+    speech = FakeEndpoint(SimpleNamespace(content=b"mp3"))
+    client = AIClient.__new__(AIClient)
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=chat),
+        audio=SimpleNamespace(speech=speech),
+    )
+    client.model_name = "gpt-4o"
+    return client
+
+
+def test_chat_create_passes_model_through(ai):
+    response = ai._chat_create(
+        "test", model="gpt-4o", messages=[{"role": "user", "content": "こんにちは"}], max_tokens=10
+    )
+    assert response.choices[0].message.content == "テスト"
+    assert ai.client.chat.completions.calls == [
+        {"model": "gpt-4o", "messages": [{"role": "user", "content": "こんにちは"}], "max_tokens": 10}
+    ]
+
+
+def test_synthesize_speech_passes_model_through(ai):
+    assert ai._synthesize_speech("こんにちは", "nova") == b"mp3"
+    assert ai.client.audio.speech.calls == [
+        {"model": TTS_MODEL, "voice": "nova", "input": "こんにちは"}
+    ]
+
+
+def test_stream_holds_slot_until_exhausted(ai, monkeypatch):
+    monkeypatch.setattr(config, "AI_MAX_IN_FLIGHT", 1)
+    chunks = [
+        SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        for text in ("ふり", "がな")
+    ]
+    ai.client.chat.completions.response = iter(chunks)
+    stream = ai._stream_chat("test", "こんにちは")
+    assert next(stream) == "ふり"
+    slots = ratelimit.limiter_for("gpt-4o")._slots
+    assert not slots.acquire(blocking=False)
+    assert list(stream) == ["がな"]
+    assert slots.acquire(blocking=False)
+
+
+class DictCache(dict):
+    def get(self, key):
+        return super().get(key)
+
+    def set(self, key, value):
+        self[key] = value
+
+
+def test_ocr_leader_rechecks_cache(ai):
+    # Lider olana kadar başka bir çağrı sonucu önbelleğe yazmış olabilir
+    ai.ocr_cache = DictCache({"key": "テキスト".encode("utf-8")})
+    assert ai._ocr_uncached(b"image", 0.1, "key") == "テキスト"
+    assert ai.client.chat.completions.calls == []
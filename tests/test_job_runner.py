@@ -0,0 +1,61 @@
+import asyncio
+
+from app.jobs.runner import JobRunner
+
+
+class FlakyStore:
+    """İlk kalem kaydında veritabanı hatası veren sahte iş deposu."""
+
+    def __init__(self):
+        self.jobs = [{"id": "job-1", "kind": "ocr", "total": 2}]
+        self.completed = []
+        self.released = []
+        self.finished = []
+        self.failures = 1
+
+    def claim(self, owner, stale_after):
+        return self.jobs.pop(0) if self.jobs else None
+
+    def pending_items(self, job_id):
+        return [0, 1]
+
+    def complete_item(self, job_id, item, result):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.completed.append(item)
+
+    def fail_item(self, job_id, item, error):
+        pass
+
+    def finish(self, job_id, owner):
+        self.finished.append(job_id)
+
+    def release(self, job_id, owner):
+        self.released.append(job_id)
+        self.jobs.append({"id": job_id, "kind": "ocr", "total": 2})
+
+    def heartbeat(self, job_id, owner):
+        return True
+
+
+def test_runner_survives_store_errors():
+    store = FlakyStore()
+
+    async def handler(job, page):
+        return {"text": str(page)}
+
+    async def main():
+        runner = JobRunner(store, {"ocr": handler}, concurrency=1, poll_interval=0.01)
+        runner.start()
+        for _ in range(200):
+            if store.finished:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return runner
+
+    runner = asyncio.run(main())
+    assert store.released == ["job-1"]
+    assert store.finished == ["job-1"]
+    assert runner._current is None
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+from app.cache.singleflight import SingleFlight
+from app.llm.executor import run_ai, run_ai_shared
+
+
+def test_async_followers_share_the_sync_call():
+    flight = SingleFlight()
+    calls = []
+    lock = threading.Lock()
+
+    def produce():
+        with lock:
+            calls.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return "sonuç"
+
+    def client_method():
+        # İstemci metotları kendi içinde aynı anahtarla do() çağırır
+        return flight.do("k", produce)
+
+    async def main():
+        return await asyncio.gather(*(run_ai_shared(flight, "k", client_method) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["sonuç"] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "shared": 9}
+
+
+def test_sync_caller_waits_for_async_leader():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "sonuç"
+
+    async def main():
+        leader = asyncio.ensure_future(run_ai_shared(flight, "k", flight.do, "k", produce))
+        await run_ai(started.wait, 5)
+        # Lider sürerken GUI gibi senkron bir çağıran gelir
+        follower = asyncio.ensure_future(run_ai(flight.do, "k", produce))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await leader, await follower
+
+    assert asyncio.run(main()) == ("sonuç", "sonuç")
+    assert calls == [1]
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app.docs.textlayer import extract_text, text_is_usable
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture(scope="module")
+def vertical_pdf():
+    with fitz.open(DATA / "Ningen Shikkaku238.PDF") as doc:
+        yield doc
+
+
+@pytest.fixture(scope="module")
+def ruby_pdf():
+    with fitz.open(DATA / "Temiz1.pdf") as doc:
+        yield doc
+
+
+def test_vertical_columns_are_joined(vertical_pdf):
+    assert extract_text(vertical_pdf.load_page(0)) == "人間失格\n太宰治"
+
+
+def test_vertical_page_breaks_only_between_columns(vertical_pdf):
+    text = extract_text(vertical_pdf.load_page(5))
+    lines = text.splitlines()
+    assert lines[0] == "間の笑いと、どこやら違う。血の重さ、とでも言おうか、生命"
+    assert all(len(line) > 1 for line in lines[:-1])
+    assert "いのち" not in text  # 生命'nin furiganası
+    assert text_is_usable(text)
+
+
+def test_horizontal_ruby_and_layout_spaces_are_dropped(ruby_pdf):
+    text = extract_text(ruby_pdf.load_page(0))
+    lines = text.splitlines()
+    assert lines[0] == "早口言葉（伝統的な物）"
+    assert "２．赤巻紙青巻紙黄巻紙" in lines
+    assert "はやくち" not in text
+    assert text_is_usable(text)
+
+
+def test_interleaved_ruby_is_not_usable(ruby_pdf):
+    for page in ruby_pdf:
+        assert not text_is_usable(page.get_text("text", sort=True))
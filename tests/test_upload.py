@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+pytest.importorskip("python_multipart")
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.docs.store import DocumentStore
+from app.docs.upload import UploadError, UploadLimitMiddleware, receive_upload, upload_error_response
+
+LIMIT = 256 * 1024
+BOUNDARY = "testboundary"
+
+
+def make_app(store):
+    async def upload(request):
+        try:
+            received = await receive_upload(request, store)
+        except UploadError as e:
+            return upload_error_response(e)
+        received.tmp_path.unlink()
+        return JSONResponse({"size": received.size, "filename": received.filename})
+
+    async def passthrough(request, call_next):
+        return await call_next(request)
+
+    app = Starlette(routes=[Route("/upload-doc", upload, methods=["POST"])])
+    # server.py'deki @app.middleware("http") katmanları gibi
+    app.add_middleware(BaseHTTPMiddleware, dispatch=passthrough)
+    app.add_middleware(UploadLimitMiddleware, path="/upload-doc", max_bytes=LIMIT)
+    return app
+
+
+def multipart_chunks(size, chunk=64 * 1024):
+    yield (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.pdf\"\r\n"
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    for start in range(0, size, chunk):
+        yield b"x" * min(chunk, size - start)
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def client(tmp_path):
+    with TestClient(make_app(DocumentStore(tmp_path))) as client:
+        yield client
+
+
+def post_chunked(client, size):
+    # Üreteçle gönderilen gövdede Content-Length yoktur (chunked)
+    return client.post(
+        "/upload-doc",
+        content=multipart_chunks(size),
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+
+
+def test_chunked_upload_within_limit(client):
+    response = post_chunked(client, 1000)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000, "filename": "a.pdf"}
+
+
+def test_chunked_upload_over_limit_is_413(client, tmp_path):
+    response = post_chunked(client, LIMIT * 2)
+    assert response.status_code == 413
+    assert list((tmp_path / "incoming").iterdir()) == []